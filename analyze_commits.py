@@ -4,48 +4,1781 @@ LMCache Contributor Leaderboard Analyzer
 Extracts, classifies, and ranks commits from the LMCache repository.
 """
 
+import gzip
+import hashlib
+import inspect
 import json
+import math
 import os
+import random
 import re
+import sqlite3
 import subprocess
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
-from datetime import datetime, timedelta
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+from datetime import date, datetime, time as day_time, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib.util import find_spec
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
+from urllib.parse import unquote, urlsplit
+
+# The provider SDKs and NumPy take seconds to import, so they are only
+# located here and imported by the code that first needs them
+ANTHROPIC_AVAILABLE = find_spec("anthropic") is not None
+OPENAI_AVAILABLE = find_spec("openai") is not None
+NUMPY_AVAILABLE = find_spec("numpy") is not None
+np = None
 
 try:
-    import anthropic
-    ANTHROPIC_AVAILABLE = True
+    import brotli
+    BROTLI_AVAILABLE = True
 except ImportError:
-    ANTHROPIC_AVAILABLE = False
+    BROTLI_AVAILABLE = False
 
 try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
+    import resource
+    RESOURCE_AVAILABLE = True
 except ImportError:
-    OPENAI_AVAILABLE = False
+    RESOURCE_AVAILABLE = False
+
+
+def source_fingerprint(func, *settings) -> str:
+    """Short hash of a function's source and the settings it reads, used to detect edited scorers."""
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = func.__qualname__
+    return hashlib.sha256(repr((source, settings)).encode()).hexdigest()[:16]
+
+
+# Heuristic score tiers, read by both the scalar scorers and BatchScoringEngine.
+# (minimum, score) pairs are checked from the top; below all of them the default applies.
+LOC_SCORE_TIERS = ((100, 30), (50, 15), (20, 8))
+LOC_DEFAULT_SCORE = 3
+FILES_SCORE_TIERS = ((5, 20), (2, 10))
+FILES_DEFAULT_SCORE = 5
+# Conventional commit keywords, checked in this order
+KEYWORD_SCORE_TIERS = (
+    (("feat:", "feature:", "refactor:", "perf:", "breaking:"), 25),  # High impact
+    (("fix:", "bug:", "improve:", "enhance:", "update:"), 15),  # Medium impact
+    (("docs:", "doc:", "typo:", "style:", "format:"), 5),  # Low impact
+    (("test:", "chore:", "ci:"), 10)  # Test/chore
+)
+KEYWORD_DEFAULT_SCORE = 12  # Commits without conventional format
+
+
+class BatchScoringEngine:
+    """NumPy implementation of the heuristic scorers and period bucketing.
+
+    Computes what calculate_loc_score, calculate_files_score,
+    calculate_keyword_score and get_time_period compute, over whole columns
+    and from the same score tiers, and groups commits per period and author
+    with array sorts and bincounts.
+    """
+
+    # CommitAnalyzer methods this engine stands in for
+    MIRRORS = ("calculate_loc_score", "calculate_files_score", "calculate_keyword_score", "get_time_period")
+
+    PERIOD_TYPES = ["weekly", "monthly", "quarterly"]
+
+    def __init__(self):
+        global np
+        if np is None:
+            import numpy as np
+
+    def heuristic_scores(self, total_lines, files_changed, messages: List[str]) -> Tuple:
+        """Return (loc, files, keyword) score arrays for columns of commits."""
+        lines = np.asarray(total_lines, dtype=np.int64)
+        files = np.asarray(files_changed, dtype=np.int64)
+        loc_scores = np.select(
+            [lines >= minimum for minimum, _ in LOC_SCORE_TIERS], [score for _, score in LOC_SCORE_TIERS], LOC_DEFAULT_SCORE
+        )
+        files_scores = np.select(
+            [files >= minimum for minimum, _ in FILES_SCORE_TIERS], [score for _, score in FILES_SCORE_TIERS], FILES_DEFAULT_SCORE
+        )
+
+        if not messages:
+            return loc_scores, files_scores, np.zeros(0, dtype=np.int64)
+        # Lowercasing can lengthen a string ("İ"), so leave room for it
+        width = 2 * max(len(message) for message in messages) + 1
+        lowered = np.char.lower(np.array(messages, dtype=f"U{width}"))
+        conditions = []
+        for keywords, _ in KEYWORD_SCORE_TIERS:
+            matched = np.zeros(len(messages), dtype=bool)
+            for keyword in keywords:
+                matched |= np.char.find(lowered, keyword) >= 0
+            conditions.append(matched)
+        keyword_scores = np.select(conditions, [score for _, score in KEYWORD_SCORE_TIERS], KEYWORD_DEFAULT_SCORE)
+        return loc_scores, files_scores, keyword_scores
+
+    @staticmethod
+    def _utc_offset(timestamp: int) -> int:
+        local = datetime.fromtimestamp(timestamp)
+        utc = datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+        return int((local - utc).total_seconds())
+
+    def local_days(self, timestamps) -> "np.ndarray":
+        """Local calendar day numbers (days since 1970-01-01), as datetime.fromtimestamp sees them."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        # The local UTC offset only changes within a UTC day on DST switches,
+        # so it is looked up per day and per commit only on those days
+        utc_days = timestamps // 86400
+        unique_days = np.unique(utc_days)
+        start_offsets = np.array([self._utc_offset(int(day) * 86400) for day in unique_days], dtype=np.int64)
+        end_offsets = np.array([self._utc_offset(int(day) * 86400 + 86399) for day in unique_days], dtype=np.int64)
+        offsets = start_offsets[np.searchsorted(unique_days, utc_days)] if len(unique_days) else np.zeros(0, dtype=np.int64)
+        switching = np.isin(utc_days, unique_days[start_offsets != end_offsets])
+        if switching.any():
+            offsets[switching] = [self._utc_offset(int(t)) for t in timestamps[switching]]
+        return (timestamps + offsets) // 86400
+
+    def period_codes(self, timestamps) -> Dict[str, "np.ndarray"]:
+        """Integer period keys per period type; format_period turns them into labels."""
+        days = self.local_days(timestamps)
+        dates = days.astype("datetime64[D]")
+        years = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+        months = dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+
+        # ISO week: the week's Thursday decides the ISO year
+        weekdays = (days + 3) % 7  # Monday = 0
+        thursdays = days - weekdays + 3
+        iso_years = thursdays.astype("datetime64[D]").astype("datetime64[Y]")
+        iso_year_starts = iso_years.astype("datetime64[D]").astype(np.int64)
+        weeks = (thursdays - iso_year_starts) // 7 + 1
+
+        # get_time_period pairs the calendar year with the ISO week number
+        return {
+            "weekly": years * 100 + weeks,
+            "monthly": years * 100 + months,
+            "quarterly": years * 10 + (months - 1) // 3 + 1
+        }
+
+    @staticmethod
+    def format_period(period_type: str, code: int) -> str:
+        if period_type == "weekly":
+            return f"{code // 100}-W{code % 100:02d}"
+        elif period_type == "monthly":
+            return f"{code // 100}-{code % 100:02d}"
+        return f"{code // 10}-Q{code % 10}"
+
+    def aggregate(self, commits: List["CommitRecord"]) -> Tuple[Dict, Dict]:
+        """Group commits by period and author, with per-group totals.
+
+        Returns the aggregate_by_period structure (periods and authors in
+        first-appearance order, commits in input order) and a map of
+        (period_type, period, author) to (commits, significant, score).
+        """
+        aggregated = {period_type: defaultdict(lambda: defaultdict(list)) for period_type in self.PERIOD_TYPES}
+        totals = {}
+        if not commits:
+            return aggregated, totals
+
+        authors, author_index = np.unique([c.author for c in commits], return_inverse=True)
+        significant = np.array([c.classification == "significant" for c in commits], dtype=np.int64)
+        scores = np.array([c.total_score for c in commits], dtype=np.int64)
+
+        for period_type, codes in self.period_codes([c.timestamp for c in commits]).items():
+            keys = codes * len(authors) + author_index
+            unique_keys, first_index, group = np.unique(keys, return_index=True, return_inverse=True)
+            members = np.argsort(group, kind="stable")
+            bounds = np.concatenate([[0], np.cumsum(np.bincount(group))])
+            commit_counts = np.diff(bounds)
+            significant_counts = np.bincount(group, weights=significant).astype(np.int64)
+            score_sums = np.bincount(group, weights=scores).astype(np.int64)
+
+            period_labels = {}
+            for g in np.argsort(first_index, kind="stable").tolist():
+                code = int(unique_keys[g]) // len(authors)
+                if code not in period_labels:
+                    period_labels[code] = self.format_period(period_type, code)
+                period = period_labels[code]
+                author = commits[int(members[bounds[g]])].author
+                aggregated[period_type][period][author] = [commits[i] for i in members[bounds[g]:bounds[g + 1]].tolist()]
+                totals[(period_type, period, author)] = (
+                    int(commit_counts[g]), int(significant_counts[g]), int(score_sums[g])
+                )
+
+        return aggregated, totals
+
+
+class CommitRecord:
+    """Compact commit record used from extraction through leaderboard generation.
+
+    One object per commit replaces the raw, merged and classified dicts:
+    author names and emails are interned, the date is an integer timestamp
+    and classification fills in the score slots. to_dict() produces the
+    output format.
+    """
+
+    __slots__ = (
+        "hash", "author", "email", "timestamp", "message",
+        "files_changed", "insertions", "deletions", "binary_files",
+        "loc_score", "files_score", "keyword_score", "ai_score", "classification"
+    )
+
+    def __init__(self, commit_hash: str, author: str, email: str, timestamp: int, message: str,
+                 files_changed: int = None, insertions: int = 0, deletions: int = 0, binary_files: Tuple[str, ...] = ()):
+        self.hash = commit_hash
+        self.author = sys.intern(author)
+        self.email = sys.intern(email)
+        self.timestamp = timestamp
+        self.message = message
+        # None until stats are known (get_commits_since does not read them)
+        self.files_changed = files_changed
+        self.insertions = insertions
+        self.deletions = deletions
+        self.binary_files = tuple(binary_files) if binary_files else ()
+        self.loc_score = 0
+        self.files_score = 0
+        self.keyword_score = 0
+        self.ai_score = 0
+        self.classification = None
+
+    @classmethod
+    def from_dict(cls, commit: Dict) -> "CommitRecord":
+        """Build a record from a commit dict in the get_commits_since format."""
+        return cls(
+            commit["hash"], commit["author_name"], commit["author_email"],
+            int(commit["timestamp"]), commit["message"], commit.get("files_changed"),
+            commit.get("insertions", 0), commit.get("deletions", 0), commit.get("binary_files", ())
+        )
+
+    @property
+    def short_hash(self) -> str:
+        return self.hash[:8]
+
+    @property
+    def date(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp)
+
+    @property
+    def total_lines(self) -> int:
+        return self.insertions + self.deletions
+
+    @property
+    def total_score(self) -> int:
+        return self.loc_score + self.files_score + self.keyword_score + self.ai_score
+
+    def scores(self) -> Dict:
+        return {
+            "loc": self.loc_score,
+            "files": self.files_score,
+            "keyword": self.keyword_score,
+            "ai": self.ai_score,
+            "total": self.total_score
+        }
+
+    def to_dict(self) -> Dict:
+        """Classified commit in the leaderboard output format."""
+        return {
+            "hash": self.short_hash,
+            "author": self.author,
+            "email": self.email,
+            "date": self.date.isoformat(),
+            "message": self.message,
+            "stats": {
+                "files": self.files_changed,
+                "lines": self.total_lines,
+                "insertions": self.insertions,
+                "deletions": self.deletions
+            },
+            "scores": self.scores(),
+            "classification": self.classification
+        }
+
+
+def display_text(text: str) -> str:
+    """Replace bytes kept undecoded by errors="surrogateescape" with U+FFFD.
+
+    Paths from `git ... -z` are raw bytes and are read with surrogateescape
+    so they can be handed back to git unchanged; names and messages shown
+    in the output go through this first.
+    """
+    return text.encode("utf-8", "surrogateescape").decode("utf-8", "replace")
+
+
+def parse_numstat_entries(entries: List[str]) -> Dict:
+    """Turn NUL-separated `--numstat -z` entries into file and line stats."""
+    files_changed = []
+    binary_files = []
+    insertions = 0
+    deletions = 0
+    entries = iter(entries)
+    for entry in entries:
+        entry = entry.lstrip("\n")
+        if not entry:
+            continue
+
+        added, removed, path = entry.split("\t", 2)
+        if not path:
+            # Renames are written as "added\tremoved\t\0old\0new"
+            next(entries, "")
+            path = next(entries, "")
+
+        files_changed.append(path)
+        # Binary files report "-" for both counts
+        if added == "-" and removed == "-":
+            binary_files.append(path)
+        if added != "-":
+            insertions += int(added)
+        if removed != "-":
+            deletions += int(removed)
+
+    return {
+        "files_changed": len(files_changed),
+        "files_list": files_changed,
+        "binary_files": binary_files,
+        "insertions": insertions,
+        "deletions": deletions,
+        "total_lines": insertions + deletions
+    }
+
+
+def parse_numstat_record(record: str) -> CommitRecord:
+    """Parse one `git log --numstat -z` record into a commit record with stats."""
+    tokens = record.split("\0")
+    parts = tokens[0].split("\x1f", 4)
+    if len(parts) < 5:
+        return None
+
+    commit_hash, author_name, author_email, timestamp, message = parts
+    stats = parse_numstat_entries(tokens[1:])
+
+    return CommitRecord(
+        commit_hash, display_text(author_name), display_text(author_email), int(timestamp), display_text(message),
+        stats["files_changed"], stats["insertions"], stats["deletions"], stats["binary_files"]
+    )
+
+
+def stream_numstat_log(repo_path: Path, args: List[str], stdin: str = None) -> Iterator[CommitRecord]:
+    """Run `git log --numstat` with extra arguments and yield parsed commits."""
+    # Records start with \x1e, header fields are separated by \x1f and
+    # -z terminates the header and every numstat entry with NUL
+    cmd = [
+        "git", "log",
+        "--format=%x1e%H%x1f%an%x1f%ae%x1f%at%x1f%s",
+        "--numstat", "-z"
+    ] + args
+    process = subprocess.Popen(
+        cmd,
+        cwd=repo_path,
+        stdin=subprocess.PIPE if stdin is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        # With -z paths are not quoted, so they need not be valid UTF-8
+        encoding="utf-8",
+        errors="surrogateescape"
+    )
+    if stdin is not None:
+        # git reads all revisions from --stdin before it starts writing
+        process.stdin.write(stdin)
+        process.stdin.close()
+
+    buffer = ""
+    try:
+        while True:
+            chunk = process.stdout.read(65536)
+            if not chunk:
+                break
+            buffer += chunk
+            records = buffer.split("\x1e")
+            # The last record may still be incomplete
+            buffer = records.pop()
+            for record in records:
+                commit = parse_numstat_record(record)
+                if commit:
+                    yield commit
+
+        commit = parse_numstat_record(buffer)
+        if commit:
+            yield commit
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        returncode = process.wait()
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+
+
+def extract_commit_range(repo_path: Path, hashes: List[str]) -> List[CommitRecord]:
+    """Process pool worker: extract commits with stats for a list of hashes, in the given order."""
+    return list(stream_numstat_log(repo_path, ["--no-walk=unsorted", "--stdin"], stdin="\n".join(hashes) + "\n"))
+
+
+class GitBatchReader:
+    """Long-lived `git diff-tree --stdin` processes answering per-commit queries.
+
+    Each query writes a commit id followed by a sentinel line, which
+    diff-tree echoes back verbatim once the commit's output is complete.
+    A process that has died is restarted and the query retried once. When
+    a query's output passes its limit the process is killed rather than
+    drained, so a huge commit costs a restart instead of reading its whole
+    patch; the next query starts a fresh process.
+    """
+
+    SENTINEL = "__lmcache_leaderboard_end__"
+
+    def __init__(self, repo_path: Path, diff_exclude: List[str] = (), metrics: "RunMetrics" = None):
+        self.repo_path = repo_path
+        self.metrics = metrics
+        pathspecs = [f":(exclude){pattern}" for pattern in diff_exclude]
+        base = ["git", "diff-tree", "--stdin", "--root", "-r", "-M", "--cc", "--no-commit-id"]
+        self.commands = {
+            # Same output as `git show --format=`
+            "diff": base + ["-p"] + (["--"] + pathspecs if pathspecs else []),
+            "stats": base + ["--numstat", "-z"]
+        }
+        self.processes = {}
+        self.lock = threading.Lock()
+
+    def _start(self, kind: str) -> subprocess.Popen:
+        process = self.processes.get(kind)
+        if process is None or process.poll() is not None:
+            if self.metrics is not None:
+                self.metrics.count("git_subprocesses")
+            process = subprocess.Popen(
+                self.commands[kind],
+                cwd=self.repo_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                encoding="utf-8",
+                # Stats keep raw path bytes; diffs are only shown to the AI
+                errors="surrogateescape" if kind == "stats" else "replace"
+            )
+            self.processes[kind] = process
+        return process
+
+    def _stop(self, kind: str):
+        process = self.processes.pop(kind, None)
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+    def _kill(self, kind: str):
+        process = self.processes.pop(kind, None)
+        if process is None:
+            return
+        process.kill()
+        process.wait()
+        for pipe in (process.stdin, process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    def _query(self, kind: str, commit_hash: str, limit: int) -> Tuple[str, bool]:
+        """Return up to `limit` characters of output for a commit and whether more was discarded."""
+        if self.metrics is not None:
+            self.metrics.count("git_queries")
+        for attempt in range(2):
+            with self.lock:
+                process = self._start(kind)
+                try:
+                    process.stdin.write(f"{commit_hash}\n{self.SENTINEL}\n")
+                    process.stdin.flush()
+                    output, truncated = self._read_until_sentinel(process, limit)
+                    if truncated:
+                        # The rest of the output is still in the pipe
+                        self._kill(kind)
+                    return output, truncated
+                except (OSError, EOFError, UnicodeDecodeError):
+                    # The stream is out of sync or the child died: restart it
+                    self._stop(kind)
+                    if attempt:
+                        raise
+        return "", False
+
+    def _read_until_sentinel(self, process: subprocess.Popen, limit: int) -> Tuple[str, bool]:
+        """Read one query's output; stops as soon as more than `limit` characters arrived."""
+        kept = []
+        size = 0
+        at_line_start = True
+        sentinel_line = self.SENTINEL + "\n"
+        # With -z the sentinel follows the last NUL-terminated entry, possibly split across reads
+        terminator = "\0" + sentinel_line
+        tail = ""
+        while True:
+            # Bounded reads, so one huge line cannot blow up memory
+            chunk = process.stdout.readline(65536)
+            if not chunk:
+                raise EOFError("git diff-tree exited")
+            if at_line_start and chunk == sentinel_line:
+                break
+            recent = (tail + chunk)[-len(terminator):]
+            if recent == terminator:
+                kept.append(chunk[:limit - size])
+                size += len(chunk) - len(sentinel_line)
+                return "".join(kept)[:min(size, limit)], size > limit
+
+            at_line_start = chunk.endswith("\n")
+            tail = recent
+            kept.append(chunk[:limit - size])
+            size += len(chunk)
+            if size > limit:
+                return "".join(kept), True
+        return "".join(kept), False
+
+    def read_diff(self, commit_hash: str, limit: int) -> Tuple[str, bool]:
+        """Return the first `limit` characters of a commit's patch and whether it was cut."""
+        return self._query("diff", commit_hash, limit)
+
+    def read_stats(self, commit_hash: str) -> Dict:
+        """Return the file and line stats of a commit."""
+        output, _ = self._query("stats", commit_hash, sys.maxsize)
+        return parse_numstat_entries(output.split("\0"))
+
+    def close(self):
+        with self.lock:
+            for kind in list(self.processes):
+                self._stop(kind)
+
+
+# Smallest history range worth handing to a separate extraction process
+MIN_COMMITS_PER_WORKER = 200
+
+# Commits classified together; bounds memory while streaming
+CLASSIFY_CHUNK_SIZE = 256
+
+# Bump when the AI prompt or its parsing changes so cached AI scores are redone
+AI_SCORING_VERSION = 2
+
+SCORE_FIELDS = ("loc", "files", "keyword", "ai")
+
+
+class ManualContributionIndex:
+    """Manual contributions parsed once and indexed for period overlap queries.
+
+    Each author's contributions are sorted by start date, with a segment tree
+    of the latest end date over that order. A query only visits subtrees that
+    can overlap the period, so it is O(log n + matches) instead of a scan that
+    re-parses every date. Open-ended ranges are stored as datetime.min/max.
+    """
+
+    def __init__(self, contributors: Dict):
+        self.authors = {}
+        for author, contributor_data in contributors.items():
+            intervals = []
+            for order, contrib in enumerate(contributor_data.get("contributions", [])):
+                try:
+                    start = datetime.fromisoformat(contrib["start_date"]) if contrib.get("start_date") else datetime.min
+                    end = datetime.fromisoformat(contrib["end_date"]) if contrib.get("end_date") else datetime.max
+                except (TypeError, ValueError) as e:
+                    print(f"Warning: Skipping manual contribution for {author}: {e}")
+                    continue
+                intervals.append((start, end, order, contrib.get("score", 0), contrib.get("notes") or ""))
+            if intervals:
+                intervals.sort(key=lambda interval: (interval[0], interval[2]))
+                self.authors[author] = (intervals, self._build_max_ends(intervals))
+
+    @staticmethod
+    def _build_max_ends(intervals: List[Tuple]) -> List[datetime]:
+        tree = [datetime.min] * (4 * len(intervals))
+
+        def build(node: int, lo: int, hi: int):
+            if hi - lo == 1:
+                tree[node] = intervals[lo][1]
+                return
+            mid = (lo + hi) // 2
+            build(2 * node, lo, mid)
+            build(2 * node + 1, mid, hi)
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+
+        build(1, 0, len(intervals))
+        return tree
+
+    def query(self, author: str, period_start: datetime, period_end: datetime) -> Tuple[int, str]:
+        """Total score and notes of an author's contributions overlapping the period."""
+        if author not in self.authors:
+            return 0, ""
+
+        intervals, tree = self.authors[author]
+        # Only contributions starting before the period ends can overlap it
+        limit = bisect_right(intervals, period_end, key=lambda interval: interval[0])
+        matches = []
+
+        def collect(node: int, lo: int, hi: int):
+            if lo >= limit or tree[node] < period_start:
+                return
+            if hi - lo == 1:
+                matches.append(intervals[lo])
+                return
+            mid = (lo + hi) // 2
+            collect(2 * node, lo, mid)
+            collect(2 * node + 1, mid, hi)
+
+        collect(1, 0, len(intervals))
+
+        # Report notes in file order, as they were entered
+        matches.sort(key=lambda interval: interval[2])
+        total_score = sum(interval[3] for interval in matches)
+        notes = "; ".join(interval[4] for interval in matches if interval[4])
+        return total_score, notes
+
+
+class DateRangeIndex:
+    """Per-author prefix sums of daily commit totals, for ranking arbitrary date ranges.
+
+    For each author the index keeps the days with commits and running totals
+    of commits, significant commits and commit score up to each day, so the
+    totals for any range take two bisects and a subtraction. A sparse table
+    over each day's first position in history finds which commit in a range
+    comes first, which gives the email and tie order a full
+    generate_leaderboard run would use.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, int, int, bool]]):
+        """entries are (author, email, day ordinal, score, significant) in history order."""
+        daily = {}
+        for position, (author, email, day, score, significant) in enumerate(entries):
+            days = daily.setdefault(author, {})
+            if day not in days:
+                days[day] = [0, 0, 0, email, position]
+            totals = days[day]
+            totals[0] += 1
+            totals[1] += int(significant)
+            totals[2] += score
+
+        self.authors = {}
+        for author, days in daily.items():
+            ordered = sorted(days)
+            cumulative = [[0], [0], [0]]
+            for day in ordered:
+                for i in range(3):
+                    cumulative[i].append(cumulative[i][-1] + days[day][i])
+            first_seen = [(days[day][4], i) for i, day in enumerate(ordered)]
+            self.authors[author] = {
+                "days": ordered,
+                "commits": cumulative[0],
+                "significant": cumulative[1],
+                "score": cumulative[2],
+                "emails": [days[day][3] for day in ordered],
+                "first_seen": self._sparse_table(first_seen)
+            }
+
+    @staticmethod
+    def _sparse_table(values: List[Tuple[int, int]]) -> List[List[Tuple[int, int]]]:
+        """levels[k][i] is the minimum of values[i:i + 2**k]."""
+        levels = [values]
+        width = 1
+        while width * 2 <= len(values):
+            previous = levels[-1]
+            levels.append([min(previous[i], previous[i + width]) for i in range(len(previous) - width)])
+            width *= 2
+        return levels
+
+    @classmethod
+    def from_commits(cls, commits: Iterable[CommitRecord]) -> "DateRangeIndex":
+        """Index classified commits given in history order."""
+        return cls(
+            (c.author, c.email, c.date.toordinal(), c.total_score, c.classification == "significant")
+            for c in commits
+        )
+
+    @classmethod
+    def from_output(cls, output: Dict) -> "DateRangeIndex":
+        """Index the commits of a leaderboard output file.
+
+        Every commit is listed under exactly one week. The output does not
+        record history order, so newest first stands in for it.
+        """
+        commits = [
+            commit
+            for contributors in output["leaderboards"].get("weekly", {}).values()
+            for contributor in contributors
+            for commit in contributor["commits"]
+        ]
+        commits.sort(key=lambda c: c["date"], reverse=True)
+        return cls(
+            (c["author"], c["email"], datetime.fromisoformat(c["date"]).toordinal(),
+             c["scores"]["total"], c["classification"] == "significant")
+            for c in commits
+        )
+
+    def query(self, start: date, end: date) -> List[Tuple[str, str, int, int, int]]:
+        """Return (author, email, commits, significant, score) for authors active in [start, end].
+
+        Authors are listed in order of their first commit in history within the range.
+        """
+        first, last = start.toordinal(), end.toordinal()
+        found = []
+        for author, data in self.authors.items():
+            lo = bisect_left(data["days"], first)
+            hi = bisect_right(data["days"], last)
+            if lo >= hi:
+                continue
+            level = (hi - lo).bit_length() - 1
+            table = data["first_seen"][level]
+            position, day_index = min(table[lo], table[hi - (1 << level)])
+            found.append((position, (
+                author,
+                data["emails"][day_index],
+                data["commits"][hi] - data["commits"][lo],
+                data["significant"][hi] - data["significant"][lo],
+                data["score"][hi] - data["score"][lo]
+            )))
+        found.sort(key=lambda item: item[0])
+        return [totals for _, totals in found]
+
+
+class LeaderboardState:
+    """Grouped commits, per-author totals and ranked leaderboards kept between watch refreshes.
+
+    periods is the aggregate_by_period structure (period type -> period ->
+    author -> commits in history order), totals maps (period_type, period,
+    author) to (commits, significant, score), commit_dicts memoizes output
+    dicts by commit hash and manual_contributions is what the manual scores
+    were computed from. CommitAnalyzer.update_leaderboards adjusts them for
+    the commits that changed and re-ranks only the periods those touch.
+    """
+
+    __slots__ = ("periods", "totals", "commit_dicts", "leaderboards", "manual_contributions")
+
+    def __init__(self, periods: Dict, totals: Dict, commit_dicts: Dict, leaderboards: Dict, manual_contributions: Dict):
+        self.periods = periods
+        self.totals = totals
+        self.commit_dicts = commit_dicts
+        self.leaderboards = leaderboards
+        self.manual_contributions = manual_contributions
+
+
+class TokenBucket:
+    """Thread-safe token bucket that limits how fast requests are sent."""
+
+    def __init__(self, rate: float, capacity: int = None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class AIUnavailableError(RuntimeError):
+    """Raised instead of sending an AI request once the run's AI budget is spent or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stops AI requests after `threshold` consecutive failures.
+
+    Once tripped, by failures or explicitly (e.g. when the time budget is
+    spent), it stays open until reset() at the start of the next run.
+    A threshold of 0 never trips on failures.
+    """
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.failures = 0
+            self.reason = None
+
+    @property
+    def open(self) -> bool:
+        return self.reason is not None
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+
+    def record_failure(self) -> bool:
+        """Count a failed request; True if this failure tripped the breaker."""
+        with self.lock:
+            self.failures += 1
+            failures = self.failures
+        if self.threshold and failures >= self.threshold:
+            return self.trip(f"{failures} AI requests failed in a row")
+        return False
+
+    def trip(self, reason: str) -> bool:
+        """Open the breaker; True for the call that opened it."""
+        with self.lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+            return True
+
+
+class ScoringBackend:
+    """Where AI impact scores come from.
+
+    complete() sends one prompt and returns the response text, giving up
+    after `timeout` seconds when one is set; retries, hedging, rate limiting
+    and metrics are left to CommitAnalyzer.request_ai_completion.
+    Backends that talk to a provider import its SDK and build their client
+    on the first request, then reuse that client (and its keep-alive
+    connection pool) from every scoring thread.
+    """
+
+    name = None
+    default_model = None
+    # False for backends that never make AI requests
+    uses_ai = True
+
+    def __init__(self, model: str = None):
+        self.model = model or self.default_model
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        """Fingerprint stored with cached AI scores."""
+        if self.model:
+            return f"{self.name}:{self.model}:v{AI_SCORING_VERSION}"
+        return f"{self.name}:v{AI_SCORING_VERSION}"
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self.create_client()
+        return self._client
+
+    def create_client(self):
+        return None
+
+    def complete(self, prompt: str, max_tokens: int, timeout: float = None) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        if self._client is not None and hasattr(self._client, "close"):
+            self._client.close()
+        self._client = None
+
+
+class HeuristicBackend(ScoringBackend):
+    """No AI requests; the AI score falls back to total_lines // 10."""
+
+    name = "heuristic"
+    uses_ai = False
+
+    def complete(self, prompt: str, max_tokens: int, timeout: float = None) -> str:
+        raise RuntimeError("The heuristic backend does not send prompts")
+
+
+class OpenAIBackend(ScoringBackend):
+    name = "openai"
+    default_model = "gpt-4o-mini"  # Fast and cost-effective
+
+    def __init__(self, api_key: str, model: str = None):
+        super().__init__(model)
+        self.api_key = api_key
+
+    def create_client(self):
+        from openai import OpenAI
+        # Retries are handled by request_ai_completion, so backoff is not applied twice
+        return OpenAI(api_key=self.api_key, max_retries=0)
+
+    def complete(self, prompt: str, max_tokens: int, timeout: float = None) -> str:
+        # The SDK reads timeout=None as "wait forever", so only pass a set one
+        options = {"timeout": timeout} if timeout else {}
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0,
+            **options
+        )
+        return response.choices[0].message.content.strip()
+
+
+class AnthropicBackend(ScoringBackend):
+    name = "anthropic"
+    default_model = "claude-3-5-sonnet-latest"
+
+    def __init__(self, api_key: str, model: str = None):
+        super().__init__(model)
+        self.api_key = api_key
+
+    def create_client(self):
+        import anthropic
+        return anthropic.Anthropic(api_key=self.api_key, max_retries=0)
+
+    def complete(self, prompt: str, max_tokens: int, timeout: float = None) -> str:
+        options = {"timeout": timeout} if timeout else {}
+        message = self.client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+            **options
+        )
+        return message.content[0].text.strip()
+
+
+class StubBackend(ScoringBackend):
+    """Offline stand-in for a provider, for tests and benchmarks.
+
+    Scores are derived from a hash of the prompt so runs are reproducible;
+    batched prompts get a JSON object keyed by commit id.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+
+    @staticmethod
+    def score(text: str) -> int:
+        return int(hashlib.sha256(text.encode()).hexdigest(), 16) % 26
+
+    @classmethod
+    def completion_text(cls, prompt: str) -> str:
+        if "### Commit " in prompt:
+            return json.dumps({commit_id: cls.score(commit_id) for commit_id in re.findall(r"### Commit (\S+)", prompt)})
+        return str(cls.score(prompt))
+
+    def complete(self, prompt: str, max_tokens: int, timeout: float = None) -> str:
+        if timeout and self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"stub response took longer than {timeout:g}s")
+        if self.latency:
+            time.sleep(self.latency)
+        return self.completion_text(prompt)
+
+
+SCORING_BACKENDS = {
+    backend.name: backend for backend in (HeuristicBackend, OpenAIBackend, AnthropicBackend, StubBackend)
+}
+
+
+class RunMetrics:
+    """Thread-safe counters, latencies and stage timings for one analysis run.
+
+    write() saves them as JSON and in the Prometheus textfile format, so a
+    node_exporter textfile collector can pick up the latest run.
+    """
+
+    COUNTERS = {
+        "git_subprocesses": "Git processes started",
+        "git_queries": "Commits queried through the persistent git readers",
+        "ai_requests": "AI provider requests sent, including retries",
+        "ai_rate_limited": "AI requests answered with 429 and retried",
+        "ai_retried": "AI requests retried after a connection error, 408, 409 or 5xx response",
+        "ai_errors": "AI requests that failed",
+        "ai_timeouts": "AI requests that timed out",
+        "ai_hedged": "Second requests sent because the first one was slow",
+        "ai_skipped": "AI requests not sent because the time budget was spent or the circuit breaker was open",
+        "ai_fallbacks": "Commits given the heuristic fallback instead of an AI score",
+        "ai_cache_hits": "AI scores served from the AI score cache",
+        "ai_cache_misses": "AI score cache lookups that missed",
+        "commits": "Commits analyzed"
+    }
+    LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+            self.counters = dict.fromkeys(self.COUNTERS, 0)
+            self.latencies = []
+            self.started = time.time()
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def observe_ai_latency(self, seconds: float):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def add_time(self, name: str, seconds: float):
+        with self.lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str, exclude: Tuple[str, ...] = ()):
+        """Add the wall time spent in the block to the named stage.
+
+        Time recorded for the `exclude` stages while the block runs, e.g.
+        by a timed() stream it consumes, is not counted twice.
+        """
+        excluded = sum(self.stages.get(other, 0.0) for other in exclude)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            elapsed -= sum(self.stages.get(other, 0.0) for other in exclude) - excluded
+            self.add_time(name, elapsed)
+
+    def timed(self, items: Iterable, name: str) -> Iterator:
+        """Pass items through, adding the time spent producing them to the named stage."""
+        iterator = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - started)
+                return
+            self.add_time(name, time.perf_counter() - started)
+            yield item
+
+    @staticmethod
+    def peak_memory_bytes() -> int:
+        """Peak resident set size of this process, or None where it is unavailable."""
+        if not RESOURCE_AVAILABLE:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            latencies = sorted(self.latencies)
+            quantiles = {
+                # Nearest-rank percentiles
+                f"p{int(q * 100)}": round(latencies[max(0, math.ceil(q * len(latencies)) - 1)], 4) if latencies else None
+                for q in self.LATENCY_QUANTILES
+            }
+            return {
+                "started": datetime.fromtimestamp(self.started).isoformat(),
+                "duration_seconds": round(time.time() - self.started, 4),
+                "stages_seconds": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+                "counters": dict(self.counters),
+                "ai_latency_seconds": dict(quantiles, count=len(latencies), sum=round(sum(latencies), 4),
+                                           max=round(latencies[-1], 4) if latencies else None),
+                "peak_memory_bytes": self.peak_memory_bytes()
+            }
+
+    def to_prometheus(self, metrics: Dict = None) -> str:
+        metrics = metrics or self.to_dict()
+        lines = [
+            "# HELP leaderboard_run_duration_seconds Wall time of the last analysis run",
+            "# TYPE leaderboard_run_duration_seconds gauge",
+            f"leaderboard_run_duration_seconds {metrics['duration_seconds']}",
+            "# HELP leaderboard_run_timestamp_seconds Start time of the last analysis run",
+            "# TYPE leaderboard_run_timestamp_seconds gauge",
+            f"leaderboard_run_timestamp_seconds {round(self.started, 3)}",
+            "# HELP leaderboard_stage_seconds Wall time per analysis stage",
+            "# TYPE leaderboard_stage_seconds gauge"
+        ]
+        lines += [f'leaderboard_stage_seconds{{stage="{name}"}} {seconds}' for name, seconds in metrics["stages_seconds"].items()]
+        for name, description in self.COUNTERS.items():
+            lines += [
+                f"# HELP leaderboard_{name}_total {description}",
+                f"# TYPE leaderboard_{name}_total counter",
+                f"leaderboard_{name}_total {metrics['counters'][name]}"
+            ]
+        latency = metrics["ai_latency_seconds"]
+        lines += [
+            "# HELP leaderboard_ai_request_seconds AI provider request latency",
+            "# TYPE leaderboard_ai_request_seconds summary"
+        ]
+        lines += [
+            f'leaderboard_ai_request_seconds{{quantile="{q}"}} {latency[f"p{int(q * 100)}"]}'
+            for q in self.LATENCY_QUANTILES if latency[f"p{int(q * 100)}"] is not None
+        ]
+        lines += [
+            f"leaderboard_ai_request_seconds_sum {latency['sum']}",
+            f"leaderboard_ai_request_seconds_count {latency['count']}"
+        ]
+        if metrics["peak_memory_bytes"] is not None:
+            lines += [
+                "# HELP leaderboard_peak_memory_bytes Peak resident memory of the analysis process",
+                "# TYPE leaderboard_peak_memory_bytes gauge",
+                f"leaderboard_peak_memory_bytes {metrics['peak_memory_bytes']}"
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_path: Path) -> Tuple[Path, Path]:
+        """Write <output>.metrics.json and <output>.prom next to the leaderboard output."""
+        metrics = self.to_dict()
+        json_path = output_path.with_name(output_path.stem + ".metrics.json")
+        prom_path = output_path.with_name(output_path.stem + ".prom")
+        with open(json_path, "w") as f:
+            json.dump(metrics, f, indent=2)
+        # Write then rename, so a collector never reads a partial file
+        tmp_path = prom_path.with_name(prom_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus(metrics))
+        os.replace(tmp_path, prom_path)
+        return json_path, prom_path
+
+
+class AIScoreCache:
+    """Content-addressed store of AI scores with least-recently-used eviction.
+
+    Keys hash the rendered single-commit prompt together with the provider
+    and model, so cherry-picks, reverts and rebased commits reuse the score
+    already paid for. Shared by the scoring threads. Writes are committed
+    every COMMIT_EVERY puts or lookups, and least recently used entries
+    beyond max_entries are evicted then, so a killed run keeps the scores
+    it paid for and a long watch session stays within the bound.
+    """
+
+    COMMIT_EVERY = 50
+
+    def __init__(self, path: str, max_entries: int = 50000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_scores (
+                key TEXT PRIMARY KEY,
+                score INTEGER,
+                last_used REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ai_scores_last_used ON ai_scores (last_used)")
+        self.conn.commit()
+        self.entries = self.conn.execute("SELECT COUNT(*) FROM ai_scores").fetchone()[0]
+        self.pending = 0
+
+    @staticmethod
+    def make_key(prompt: str, scorer_version: str) -> str:
+        return hashlib.sha256(f"{scorer_version}\0{prompt}".encode()).hexdigest()
+
+    def get(self, key: str) -> int:
+        """Return the cached score for a key, or None."""
+        with self.lock:
+            row = self.conn.execute("SELECT score FROM ai_scores WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE ai_scores SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._written()
+            return row[0]
+
+    def put(self, key: str, score: int):
+        with self.lock:
+            now = time.time()
+            updated = self.conn.execute(
+                "UPDATE ai_scores SET score = ?, last_used = ? WHERE key = ?", (score, now, key)
+            ).rowcount
+            if not updated:
+                self.conn.execute("INSERT INTO ai_scores VALUES (?, ?, ?)", (key, score, now))
+                self.entries += 1
+            self._written()
+
+    def _written(self):
+        self.pending += 1
+        if self.pending >= self.COMMIT_EVERY:
+            self._flush()
+
+    def _flush(self):
+        """Evict least recently used entries beyond max_entries and commit."""
+        if self.entries > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM ai_scores WHERE key IN "
+                "(SELECT key FROM ai_scores ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self.entries = self.max_entries
+        self.conn.commit()
+        self.pending = 0
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.conn.close()
+
+
+class ClassificationCache:
+    """On-disk store of commit scores keyed by full commit SHA.
+
+    Every score is stored next to the fingerprint of the scorer that produced
+    it, so a changed scorer only invalidates its own field.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS commit_scores (
+                hash TEXT PRIMARY KEY,
+                loc INTEGER, loc_version TEXT,
+                files INTEGER, files_version TEXT,
+                keyword INTEGER, keyword_version TEXT,
+                ai INTEGER, ai_version TEXT
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, commit_hash: str) -> Dict:
+        """Return cached scores and versions for a commit, or an empty dict."""
+        row = self.conn.execute(
+            "SELECT loc, loc_version, files, files_version, keyword, keyword_version, ai, ai_version "
+            "FROM commit_scores WHERE hash = ?",
+            (commit_hash,)
+        ).fetchone()
+        if row is None:
+            return {}
+
+        cached = {}
+        for i, field in enumerate(SCORE_FIELDS):
+            cached[field] = row[i * 2]
+            cached[f"{field}_version"] = row[i * 2 + 1]
+        return cached
+
+    def put(self, commit_hash: str, scores: Dict, versions: Dict):
+        """Store the scores of a commit together with their scorer versions."""
+        values = [commit_hash]
+        for field in SCORE_FIELDS:
+            values.extend([scores[field], versions[field]])
+        self.conn.execute(
+            "INSERT OR REPLACE INTO commit_scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            values
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class ClassificationCheckpoint:
+    """Append-only NDJSON log of classified commits, used to resume an interrupted run.
+
+    The first line is a header naming the repository and scorer versions;
+    each further line is one classified commit. A checkpoint written with
+    other scorers is discarded, and a line cut off by a crash is dropped.
+    """
+
+    FORMAT = 1
+    # Lines appended between fsync calls
+    SYNC_EVERY = 50
+
+    def __init__(self, path: str, header: Dict):
+        self.path = Path(path)
+        self.header = dict(header, checkpoint=self.FORMAT)
+        self.file = None
+        self.unsynced = 0
+
+    def _read_lines(self) -> Iterator[Tuple[Dict, int]]:
+        """Yield (entry, end offset) for each complete line of the file."""
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                try:
+                    entry = json.loads(line.decode("utf-8", "surrogateescape"))
+                except ValueError:
+                    return
+                offset += len(line)
+                yield entry, offset
+
+    def load(self) -> Dict[str, Tuple[CommitRecord, Dict]]:
+        """Return {hash: (commit, versions)} from a matching checkpoint and open it for appending."""
+        entries = {}
+        valid_end = 0
+        if self.path.exists():
+            lines = self._read_lines()
+            first = next(lines, None)
+            if first is not None and first[0] == self.header:
+                valid_end = first[1]
+                for entry, valid_end in lines:
+                    entries[entry["hash"]] = self.decode(entry)
+            elif first is not None:
+                print("   Checkpoint was written with different settings, starting over")
+
+        self.file = open(self.path, "ab")
+        # Drop an incomplete tail or a stale checkpoint before appending
+        self.file.truncate(valid_end)
+        if valid_end == 0:
+            self._write(self.header)
+        return entries
+
+    def records(self) -> Iterator[Tuple[CommitRecord, Dict]]:
+        """Stream the (commit, versions) pairs stored so far, in the order they were written."""
+        self.sync()
+        lines = self._read_lines()
+        next(lines, None)
+        for entry, _ in lines:
+            yield self.decode(entry)
+
+    @staticmethod
+    def encode(commit: CommitRecord, versions: Dict) -> Dict:
+        entry = {slot: getattr(commit, slot) for slot in CommitRecord.__slots__}
+        entry["versions"] = versions
+        return entry
+
+    @staticmethod
+    def decode(entry: Dict) -> Tuple[CommitRecord, Dict]:
+        commit = CommitRecord(
+            entry["hash"], entry["author"], entry["email"], entry["timestamp"], entry["message"],
+            entry["files_changed"], entry["insertions"], entry["deletions"], entry["binary_files"]
+        )
+        commit.loc_score = entry["loc_score"]
+        commit.files_score = entry["files_score"]
+        commit.keyword_score = entry["keyword_score"]
+        commit.ai_score = entry["ai_score"]
+        commit.classification = entry["classification"]
+        return commit, entry["versions"]
+
+    def _write(self, entry: Dict):
+        # Binary file paths may hold undecodable bytes (see stream_numstat_log)
+        self.file.write(json.dumps(entry, ensure_ascii=False).encode("utf-8", "surrogateescape") + b"\n")
+        self.unsynced += 1
+        if self.unsynced >= self.SYNC_EVERY:
+            self.sync()
+
+    def append(self, commit: CommitRecord, versions: Dict):
+        self._write(self.encode(commit, versions))
+
+    def sync(self):
+        if self.file is not None and self.unsynced:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        """Delete the checkpoint once the run it belongs to has completed."""
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+def _write_if_changed(path: Path, content: bytes, digest: str, previous_digest: str) -> bool:
+    """Atomically write a shard unless the file already holds this content."""
+    if previous_digest == digest and path.exists():
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+    return True
+
+
+def write_sharded_output(output: Dict, shard_dir: str) -> Tuple[int, int]:
+    """Write analysis output as a manifest plus per-period and commit-table shards.
+
+    Layout under shard_dir:
+      manifest.json              run info plus path and sha256 of every shard
+      commits/<YYYY-MM>.json     each commit once, keyed by its short hash
+      <period_type>/<period>.json contributors referencing commits by hash
+
+    A client fetches the manifest, one period shard and the commit shards
+    listed in it. Shards whose content hash is unchanged are not rewritten,
+    and shards that are no longer referenced are removed. Returns the number
+    of shards written and skipped.
+    """
+    shard_dir = Path(shard_dir)
+    manifest_path = shard_dir / "manifest.json"
+    previous = {}
+    if manifest_path.exists():
+        try:
+            previous = json.loads(manifest_path.read_text())
+        except ValueError:
+            previous = {}
+    previous_digests = {entry["path"]: entry["sha256"] for entry in previous.get("shards", [])}
+
+    def encode(data) -> Tuple[bytes, str]:
+        content = json.dumps(data, separators=(",", ":")).encode()
+        return content, hashlib.sha256(content).hexdigest()
+
+    # Every commit lands in exactly one monthly bucket, which shards the table
+    commit_tables = defaultdict(dict)
+    period_shards = {}
+    for period_type, periods in output["leaderboards"].items():
+        for period, contributors in periods.items():
+            commit_months = set()
+            entries = []
+            for contributor in contributors:
+                commit_ids = []
+                for commit in contributor["commits"]:
+                    month = commit["date"][:7]
+                    commit_tables[month][commit["hash"]] = commit
+                    commit_months.add(month)
+                    commit_ids.append(commit["hash"])
+                entries.append({**contributor, "commits": commit_ids})
+            period_shards[f"{period_type}/{period}.json"] = {
+                "period_type": period_type,
+                "period": period,
+                "commit_shards": sorted(f"commits/{month}.json" for month in commit_months),
+                "contributors": entries
+            }
+
+    shards = []
+    written = skipped = 0
+    for path, data in [(f"commits/{month}.json", table) for month, table in sorted(commit_tables.items())] + list(period_shards.items()):
+        content, digest = encode(data)
+        if _write_if_changed(shard_dir / path, content, digest, previous_digests.get(path)):
+            written += 1
+        else:
+            skipped += 1
+        shards.append({"path": path, "sha256": digest, "bytes": len(content)})
+
+    manifest = {key: value for key, value in output.items() if key != "leaderboards"}
+    manifest["periods"] = {
+        period_type: {
+            period: f"{period_type}/{period}.json" for period in periods
+        }
+        for period_type, periods in output["leaderboards"].items()
+    }
+    manifest["shards"] = shards
+    # The manifest goes last so readers never see it reference a missing shard
+    content, digest = encode(manifest)
+    _write_if_changed(manifest_path, content, digest, None)
+
+    current = {shard["path"] for shard in shards}
+    for path in previous_digests:
+        if path not in current and (shard_dir / path).exists():
+            (shard_dir / path).unlink()
+
+    return written, skipped
+
+
+def load_sharded_output(shard_dir: str) -> Dict:
+    """Reassemble the single-file output format from a shard directory."""
+    shard_dir = Path(shard_dir)
+    manifest = json.loads((shard_dir / "manifest.json").read_text())
+    commit_tables = {}
+    leaderboards = {}
+    for period_type, periods in manifest["periods"].items():
+        leaderboards[period_type] = {}
+        for period, path in periods.items():
+            shard = json.loads((shard_dir / path).read_text())
+            commits = {}
+            for commit_shard in shard["commit_shards"]:
+                if commit_shard not in commit_tables:
+                    commit_tables[commit_shard] = json.loads((shard_dir / commit_shard).read_text())
+                commits.update(commit_tables[commit_shard])
+            leaderboards[period_type][period] = [
+                {**contributor, "commits": [commits[commit_id] for commit_id in contributor["commits"]]}
+                for contributor in shard["contributors"]
+            ]
+
+    output = {key: value for key, value in manifest.items() if key not in ("periods", "shards")}
+    output["leaderboards"] = leaderboards
+    return output
+
+
+class Payload:
+    """A response body with its precomputed encodings and ETag.
+
+    Each encoding is a different representation, so it gets its own strong
+    ETag: the identity one with a -gz or -br suffix.
+    """
+
+    __slots__ = ("body", "gzip", "brotli", "etag")
+
+    ETAG_SUFFIXES = {None: "", "gzip": "-gz", "br": "-br"}
+
+    def __init__(self, body: bytes, etag: str = None):
+        self.body = body
+        self.etag = etag or '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        # mtime=0 keeps the encoding identical for identical bodies
+        self.gzip = gzip.compress(body, compresslevel=9, mtime=0)
+        # Quality 9 compresses almost as well as 11 at a fraction of the time
+        self.brotli = brotli.compress(body, quality=9) if BROTLI_AVAILABLE else None
+
+    def encoded(self, accept_encoding: str) -> Tuple[bytes, str]:
+        """Return the smallest body the client accepts and its Content-Encoding."""
+        accepted = set()
+        for item in accept_encoding.split(","):
+            coding, _, params = item.strip().partition(";")
+            if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                continue
+            accepted.add(coding.strip().lower())
+        if self.brotli is not None and ("br" in accepted or "*" in accepted):
+            return self.brotli, "br"
+        if "gzip" in accepted or "*" in accepted:
+            return self.gzip, "gzip"
+        return self.body, None
+
+    def tag(self, encoding: str = None) -> str:
+        """ETag of the body sent with the given Content-Encoding."""
+        return self.etag[:-1] + self.ETAG_SUFFIXES[encoding] + '"'
+
+    def matches(self, if_none_match: str) -> bool:
+        """Whether an If-None-Match header names any encoding of this body."""
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or any(self.tag(encoding) in tags for encoding in self.ETAG_SUFFIXES)
+
+
+class LeaderboardServer:
+    """Serve leaderboard output and slices of it from memory over HTTP.
+
+    Every document is serialized and compressed once, when the output is
+    published; requests only pick the precomputed bytes. Responses carry a
+    strong ETag per encoding and are revalidated with If-None-Match, so an unchanged
+    leaderboard costs a 304. Routes:
+
+        /  or  /<output file name>           the full output
+        /leaderboards/<period_type>           one period type
+        /leaderboards/<period_type>/<period>  one period's contributors
+        /periods                              period types and their periods
+        /health
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8000, output_name: str = "leaderboard-data.json"):
+        self.output_name = output_name
+        self.payloads = {}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server.server_address[:2]
+
+    def publish(self, output: Dict, content: bytes = None):
+        """Precompute the payloads for an output and make them live.
+
+        content is the output file as written; the full document is served
+        byte for byte. Payloads whose body did not change are reused, so only
+        changed slices are compressed again.
+        """
+        if content is None:
+            content = json.dumps(output, indent=2).encode()
+        previous = {payload.etag: payload for payload in self.payloads.values()}
+
+        def make(data) -> Payload:
+            body = data if isinstance(data, bytes) else json.dumps(data, separators=(",", ":")).encode()
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            return previous.get(etag) or Payload(body, etag)
+
+        leaderboards = output.get("leaderboards", {})
+        payloads = {"/": make(content)}
+        payloads["/" + self.output_name] = payloads["/"]
+        payloads["/periods"] = make({
+            "last_updated": output.get("last_updated"),
+            "periods": {period_type: list(periods) for period_type, periods in leaderboards.items()}
+        })
+        for period_type, periods in leaderboards.items():
+            payloads[f"/leaderboards/{period_type}"] = make(periods)
+            for period, contributors in periods.items():
+                payloads[f"/leaderboards/{period_type}/{period}"] = make(contributors)
+        # Handlers read self.payloads once per request, so swapping it is atomic for them
+        self.payloads = payloads
+
+    def load(self, path: Path):
+        """Publish an output file from disk."""
+        content = Path(path).read_bytes()
+        self.publish(json.loads(content), content)
+
+    def follow(self, path: Path, interval: float = 2.0):
+        """Reload the output file in the background whenever it changes on disk."""
+        def poll():
+            last = None
+            while True:
+                try:
+                    stat = path.stat()
+                    current = (stat.st_mtime_ns, stat.st_size)
+                    if current != last:
+                        self.load(path)
+                        last = current
+                except (OSError, ValueError) as e:
+                    # Missing or half-written file: keep serving the previous output
+                    print(f"   Could not load {path}: {e}")
+                time.sleep(interval)
+
+        threading.Thread(target=poll, daemon=True).start()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def end_headers(self):
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Access-Control-Expose-Headers", "ETag")
+                super().end_headers()
+
+            def do_OPTIONS(self):
+                self.send_response(204)
+                self.send_header("Access-Control-Allow-Methods", "GET, HEAD, OPTIONS")
+                self.send_header("Access-Control-Allow-Headers", "If-None-Match")
+                self.send_header("Access-Control-Max-Age", "86400")
+                self.end_headers()
+
+            def do_HEAD(self):
+                self.respond(include_body=False)
+
+            def do_GET(self):
+                self.respond(include_body=True)
+
+            def respond(self, include_body: bool):
+                path = unquote(urlsplit(self.path).path).rstrip("/") or "/"
+                if path == "/health":
+                    self.send_bytes(200, b'{"status":"ok"}', include_body)
+                    return
+                payload = server.payloads.get(path)
+                if payload is None:
+                    self.send_bytes(404, b'{"error":"not found"}', include_body)
+                    return
+
+                body, encoding = payload.encoded(self.headers.get("Accept-Encoding", ""))
+                if payload.matches(self.headers.get("If-None-Match", "")):
+                    self.send_response(304)
+                    self.send_header("ETag", payload.tag(encoding))
+                    self.send_header("Cache-Control", "no-cache")
+                    self.send_header("Vary", "Accept-Encoding")
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", payload.tag(encoding))
+                # Clients may keep a copy but must revalidate it
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Vary", "Accept-Encoding")
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                self.end_headers()
+                if include_body:
+                    self.wfile.write(body)
+
+            def send_bytes(self, status: int, body: bytes, include_body: bool):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                if include_body:
+                    self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        """Serve on a background thread."""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def serve_forever(self):
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n👋 Stopped serving")
+        finally:
+            self.server.server_close()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
 
 
 class CommitAnalyzer:
-    def __init__(self, repo_path: str, anthropic_api_key: str = None, openai_api_key: str = None, manual_contributions_path: str = "manual-contributions.json"):
+    def __init__(self, repo_path: str, anthropic_api_key: str = None, openai_api_key: str = None, manual_contributions_path: str = "manual-contributions.json", cache_path: str = None, ai_concurrency: int = 4, ai_rate_limit: float = 5.0, ai_max_retries: int = 5, ai_batch_size: int = 1, ai_cache_path: str = None, ai_cache_max_entries: int = 50000, diff_preview_chars: int = 4000, diff_exclude: List[str] = None, skip_binary_diffs: bool = False, persistent_git: bool = True, extract_workers: int = 1, shard_dir: str = None, vectorized: bool = True, write_metrics: bool = True, checkpoint_path: str = None, scoring_backend: str = "auto", ai_timeout: float = 30.0, ai_budget: float = None, ai_hedge_after: float = None, ai_breaker_threshold: int = 5):
         self.repo_path = Path(repo_path)
+        self.cache_path = cache_path
+        self.ai_cache_path = ai_cache_path
+        self.ai_cache_max_entries = ai_cache_max_entries
+        # Opened by analyze() while a run is in progress
+        self.ai_cache = None
+
+        # Diff previews for AI scoring: size budget and paths left out of them
+        self.diff_preview_chars = diff_preview_chars
+        self.diff_exclude = list(diff_exclude or [])
+        self.skip_binary_diffs = skip_binary_diffs
+
+        # Score and bucket whole columns with NumPy when it is installed
+        self.vectorized = vectorized
+        self._batch_engine = None
+
+        # Also write the output as lazily loadable shards
+        self.shard_dir = shard_dir
+
+        self.last_ai_cache_stats = None
+
+        # Processes used to extract history ranges in parallel
+        self.extract_workers = max(1, extract_workers)
+
+        # NDJSON log of classified commits that lets an interrupted run resume
+        self.checkpoint_path = checkpoint_path
+
+        # Query server given each new output (set by --serve)
+        self.server = None
+
+        # Timings and counters of the current run, written next to the output
+        self.metrics = RunMetrics()
+        self.write_metrics = write_metrics
+
+        # Per-commit git queries go to long-lived processes started on first use
+        self.git_reader = GitBatchReader(self.repo_path, self.diff_exclude, self.metrics) if persistent_git else None
+
+        # AI requests run on a thread pool, throttled by a shared token bucket
+        self.ai_concurrency = max(1, ai_concurrency)
+        self.ai_rate_limiter = TokenBucket(ai_rate_limit) if ai_rate_limit and ai_rate_limit > 0 else None
+        self.ai_max_retries = ai_max_retries
+        # Commits packed into one AI request (1 sends a prompt per commit)
+        self.ai_batch_size = max(1, ai_batch_size)
+
+        # Seconds a single AI request may take, and the AI time budget of a run
+        self.ai_timeout = ai_timeout
+        self.ai_budget = ai_budget
+        self._ai_deadline = None
+        # Send a second copy of a request that has not answered after this many seconds
+        self.ai_hedge_after = ai_hedge_after
+        self._hedge_pool = None
+        self._hedge_lock = threading.Lock()
+        # After this many failures in a row the rest of the run uses the heuristic
+        self.ai_breaker = CircuitBreaker(ai_breaker_threshold)
+        # Commits whose AI score is the heuristic fallback; they are scored again by the next run
+        self.fallback_commits = set()
 
         # Try OpenAI first, then Anthropic
         self.openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
         self.anthropic_api_key = anthropic_api_key or os.getenv("ANTHROPIC_API_KEY")
 
-        # Initialize OpenAI client if available
-        if OPENAI_AVAILABLE and self.openai_api_key:
-            self.openai_client = OpenAI(api_key=self.openai_api_key)
-            self.ai_provider = "openai"
-        # Fall back to Anthropic
-        elif ANTHROPIC_AVAILABLE and self.anthropic_api_key:
-            self.client = anthropic.Anthropic(api_key=self.anthropic_api_key)
-            self.ai_provider = "anthropic"
-        else:
-            self.openai_client = None
-            self.client = None
-            self.ai_provider = None
+        # Provider SDKs are imported by the backend on its first request
+        self.scoring_backend = self.select_scoring_backend(scoring_backend)
+        self.ai_provider = self.scoring_backend.name if self.scoring_backend.uses_ai else None
 
         self.manual_contributions_path = Path(manual_contributions_path)
 
@@ -54,6 +1787,7 @@ class CommitAnalyzer:
 
         # Load manual contributions
         self.manual_contributions = self.load_manual_contributions()
+        self.manual_index = ManualContributionIndex(self.manual_contributions)
 
     def load_manual_contributions(self) -> Dict:
         """Load manually assigned contribution scores."""
@@ -90,52 +1824,22 @@ class CommitAnalyzer:
 
     def get_manual_score_for_period(self, author: str, period_start: datetime, period_end: datetime) -> Tuple[int, str]:
         """Get manual contribution score for a specific time period."""
-        if author not in self.manual_contributions:
-            return 0, ""
-
-        contributor_data = self.manual_contributions[author]
-        contributions = contributor_data.get("contributions", [])
-
-        total_score = 0
-        notes_list = []
-
-        for contrib in contributions:
-            contrib_start = datetime.fromisoformat(contrib["start_date"]) if contrib.get("start_date") else None
-            contrib_end = datetime.fromisoformat(contrib["end_date"]) if contrib.get("end_date") else None
-
-            # Check if contribution overlaps with the period
-            # If no dates specified, applies to all periods
-            if contrib_start is None and contrib_end is None:
-                total_score += contrib.get("score", 0)
-                if contrib.get("notes"):
-                    notes_list.append(contrib["notes"])
-            elif contrib_start is None and contrib_end >= period_start:
-                total_score += contrib.get("score", 0)
-                if contrib.get("notes"):
-                    notes_list.append(contrib["notes"])
-            elif contrib_end is None and contrib_start <= period_end:
-                total_score += contrib.get("score", 0)
-                if contrib.get("notes"):
-                    notes_list.append(contrib["notes"])
-            elif contrib_start and contrib_end and contrib_start <= period_end and contrib_end >= period_start:
-                total_score += contrib.get("score", 0)
-                if contrib.get("notes"):
-                    notes_list.append(contrib["notes"])
-
-        return total_score, "; ".join(notes_list)
+        return self.manual_index.query(author, period_start, period_end)
 
     def run_git_command(self, cmd: List[str]) -> str:
         """Execute git command and return output."""
+        self.metrics.count("git_subprocesses")
         result = subprocess.run(
             cmd,
             cwd=self.repo_path,
             capture_output=True,
-            text=True,
+            encoding="utf-8",
+            errors="replace",
             check=True
         )
         return result.stdout.strip()
 
-    def get_commits_since(self, days: int = 365) -> List[Dict]:
+    def get_commits_since(self, days: int = 365) -> List[CommitRecord]:
         """Get all commits from the last N days."""
         since_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
 
@@ -158,20 +1862,96 @@ class CommitAnalyzer:
 
             commit_hash, author_name, author_email, timestamp, message = parts
 
-            commits.append({
-                "hash": commit_hash,
-                "author_name": author_name,
-                "author_email": author_email,
-                "timestamp": int(timestamp),
-                "date": datetime.fromtimestamp(int(timestamp)),
-                "message": message
-            })
+            commits.append(CommitRecord(commit_hash, author_name, author_email, int(timestamp), message))
 
         return commits
 
+    def iter_commits_with_stats(self, days: int = 365) -> Iterator[CommitRecord]:
+        """Stream commits from the last N days together with their file and line stats.
+
+        Uses a single `git log --numstat` pass, so each commit costs a parse
+        instead of the three `git show` calls made by get_commit_stats. With
+        extract_workers > 1 the history is split into contiguous ranges that
+        are extracted in parallel and yielded back in serial order.
+        """
+        since_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+        if self.extract_workers <= 1:
+            self.metrics.count("git_subprocesses")
+            yield from stream_numstat_log(self.repo_path, [f"--since={since_date}", "--no-merges"])
+            return
+
+        # rev-list is cheap (no diffs), and its order is the order git log uses
+        hashes = self.run_git_command([
+            "git", "rev-list", f"--since={since_date}", "--no-merges", "HEAD"
+        ]).split()
+        chunk_size = max(MIN_COMMITS_PER_WORKER, -(-len(hashes) // self.extract_workers))
+        ranges = [hashes[i:i + chunk_size] for i in range(0, len(hashes), chunk_size)]
+        if len(ranges) <= 1:
+            self.metrics.count("git_subprocesses")
+            yield from stream_numstat_log(self.repo_path, [f"--since={since_date}", "--no-merges"])
+            return
+
+        self.metrics.count("git_subprocesses", len(ranges))
+        with ProcessPoolExecutor(max_workers=min(self.extract_workers, len(ranges))) as executor:
+            for commits in executor.map(extract_commit_range, [self.repo_path] * len(ranges), ranges):
+                yield from commits
+
+    def get_commit_diff(self, commit_hash: str, exclude_paths: List[str] = ()) -> str:
+        """Get the diff preview used for AI analysis.
+
+        The diff is streamed from git and the process is stopped once the
+        preview budget is read, so huge commits cost no more than small ones.
+        """
+        if self.git_reader is not None and not exclude_paths:
+            diff_output, truncated = self.git_reader.read_diff(commit_hash, self.diff_preview_chars + 1)
+            if truncated or len(diff_output) > self.diff_preview_chars:
+                return diff_output[:self.diff_preview_chars] + "..."
+            return diff_output.strip()
+
+        # No commit header: the message is already in the prompt, and identical
+        # changes (cherry-picks, rebases) then render identical prompts
+        cmd = ["git", "show", "--format=", commit_hash]
+        excludes = [f":(exclude,literal){path}" for path in exclude_paths]
+        excludes += [f":(exclude){pattern}" for pattern in self.diff_exclude]
+        if excludes:
+            cmd += ["--"] + excludes
+
+        self.metrics.count("git_subprocesses")
+        process = subprocess.Popen(
+            cmd,
+            cwd=self.repo_path,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding="utf-8",
+            errors="replace"
+        )
+        try:
+            # One extra character tells us whether the diff was truncated
+            diff_output = process.stdout.read(self.diff_preview_chars + 1)
+            truncated = len(diff_output) > self.diff_preview_chars
+            if truncated:
+                process.kill()
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            returncode = process.wait()
+
+        if truncated:
+            return diff_output[:self.diff_preview_chars] + "..."
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+        return diff_output.strip()
+
     def get_commit_stats(self, commit_hash: str) -> Dict:
         """Get detailed stats for a single commit."""
         try:
+            if self.git_reader is not None:
+                stats = self.git_reader.read_stats(commit_hash)
+                stats["diff"] = self.get_commit_diff(commit_hash)
+                return stats
+
             # Get file changes
             files_output = self.run_git_command([
                 "git", "show", "--pretty=", "--name-only", commit_hash
@@ -194,11 +1974,7 @@ class CommitAnalyzer:
                 deletions = int(stats_match.group(1))
 
             # Get diff for AI analysis
-            diff_output = self.run_git_command([
-                "git", "show", commit_hash
-            ])
-            # Limit diff size for AI (max 4000 chars)
-            diff_truncated = diff_output[:4000] + ("..." if len(diff_output) > 4000 else "")
+            diff_truncated = self.get_commit_diff(commit_hash)
 
             return {
                 "files_changed": len(files_changed),
@@ -221,51 +1997,67 @@ class CommitAnalyzer:
 
     def calculate_loc_score(self, total_lines: int) -> int:
         """Score based on lines of code changed."""
-        if total_lines >= 100:
-            return 30
-        elif total_lines >= 50:
-            return 15
-        elif total_lines >= 20:
-            return 8
-        else:
-            return 3
+        for minimum, score in LOC_SCORE_TIERS:
+            if total_lines >= minimum:
+                return score
+        return LOC_DEFAULT_SCORE
 
     def calculate_files_score(self, files_changed: int) -> int:
         """Score based on number of files modified."""
-        if files_changed >= 5:
-            return 20
-        elif files_changed >= 2:
-            return 10
-        else:
-            return 5
+        for minimum, score in FILES_SCORE_TIERS:
+            if files_changed >= minimum:
+                return score
+        return FILES_DEFAULT_SCORE
 
     def calculate_keyword_score(self, message: str) -> int:
         """Score based on conventional commit keywords."""
         message_lower = message.lower()
-
-        # High impact keywords
-        if any(kw in message_lower for kw in ["feat:", "feature:", "refactor:", "perf:", "breaking:"]):
-            return 25
-        # Medium impact
-        elif any(kw in message_lower for kw in ["fix:", "bug:", "improve:", "enhance:", "update:"]):
-            return 15
-        # Low impact
-        elif any(kw in message_lower for kw in ["docs:", "doc:", "typo:", "style:", "format:"]):
-            return 5
-        # Test/chore
-        elif any(kw in message_lower for kw in ["test:", "chore:", "ci:"]):
-            return 10
-        else:
-            return 12  # Default for commits without conventional format
+        for keywords, score in KEYWORD_SCORE_TIERS:
+            if any(kw in message_lower for kw in keywords):
+                return score
+        return KEYWORD_DEFAULT_SCORE
 
     def calculate_ai_score(self, commit_data: Dict) -> int:
         """Use AI to evaluate commit significance (0-25 points)."""
+        return self._calculate_ai_score(commit_data)[0]
+
+    def _calculate_ai_score(self, commit_data: Dict) -> Tuple[int, str]:
+        """Return the AI score and the scorer version that produced it.
+
+        Fallback scores after a failed or skipped request get the version
+        "fallback" so they are never mistaken for real AI scores by the
+        cache, and the next run scores those commits again.
+        """
         if not self.ai_provider:
             # Fallback: simple heuristic
-            return min(25, commit_data["total_lines"] // 10)
+            return min(25, commit_data["total_lines"] // 10), self.scoring_fingerprints()["ai"]
+
+        version = self.scoring_fingerprints()["ai"]
+        prompt = self.render_ai_prompt(commit_data)
+        cache_key = AIScoreCache.make_key(prompt, version)
+        if self.ai_cache:
+            cached_score = self.ai_cache.get(cache_key)
+            if cached_score is not None:
+                return cached_score, version
 
         try:
-            prompt = f"""Analyze this git commit and rate its significance from 0-25 points.
+            score_text = self.request_ai_completion(prompt)
+            score = min(25, max(0, int(re.search(r"\d+", score_text).group())))
+            if self.ai_cache:
+                self.ai_cache.put(cache_key, score)
+            return score, version
+
+        except AIUnavailableError:
+            self.metrics.count("ai_fallbacks")
+            return min(25, commit_data["total_lines"] // 10), "fallback"
+        except Exception as e:
+            print(f"AI scoring failed: {e}, using fallback")
+            self.metrics.count("ai_fallbacks")
+            return min(25, commit_data["total_lines"] // 10), "fallback"
+
+    def render_ai_prompt(self, commit_data: Dict) -> str:
+        """Render the single-commit AI scoring prompt."""
+        return f"""Analyze this git commit and rate its significance from 0-25 points.
 
 Commit message: {commit_data['message']}
 Files changed: {commit_data['files_changed']}
@@ -282,66 +2074,335 @@ Diff preview:
 
 Respond with ONLY a number from 0-25."""
 
-            if self.ai_provider == "openai":
-                # Use OpenAI ChatGPT
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-4o-mini",  # Fast and cost-effective
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=10,
-                    temperature=0
-                )
-                score_text = response.choices[0].message.content.strip()
-            else:
-                # Use Anthropic Claude
-                message = self.client.messages.create(
-                    model="claude-3-5-sonnet-latest",
-                    max_tokens=10,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                score_text = message.content[0].text.strip()
+    def calculate_ai_scores_batch(self, commits_data: List[Dict]) -> List[Tuple[int, str]]:
+        """Score several commits with one AI request.
+
+        Returns (score, version) pairs in input order. Entries that are
+        missing or malformed in the response fall back to the heuristic for
+        that commit only.
+        """
+        fallback = [(min(25, c["total_lines"] // 10), "fallback") for c in commits_data]
+        if not self.ai_provider:
+            version = self.scoring_fingerprints()["ai"]
+            return [(score, version) for score, _ in fallback]
+
+        version = self.scoring_fingerprints()["ai"]
+        results = [None] * len(commits_data)
+        cache_keys = [AIScoreCache.make_key(self.render_ai_prompt(c), version) for c in commits_data]
+        if self.ai_cache:
+            for i, cache_key in enumerate(cache_keys):
+                cached_score = self.ai_cache.get(cache_key)
+                if cached_score is not None:
+                    results[i] = (cached_score, version)
+
+        # Only commits without a cached score are sent
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+        pending_data = [commits_data[i] for i in pending]
+
+        ids = [c["hash"][:12] for c in pending_data]
+        sections = []
+        for commit_id, commit_data in zip(ids, pending_data):
+            sections.append(f"""### Commit {commit_id}
+Commit message: {commit_data['message']}
+Files changed: {commit_data['files_changed']}
+Lines changed: {commit_data['total_lines']} ({commit_data['insertions']}+, {commit_data['deletions']}-)
+
+Diff preview:
+{commit_data['diff'][:1000]}
+""")
 
-            score = int(re.search(r"\d+", score_text).group())
-            return min(25, max(0, score))
+        prompt = f"""Analyze each of these git commits and rate its significance from 0-25 points.
 
+Consider:
+- Impact on architecture/design (high=20-25, medium=10-19, low=0-9)
+- Bug severity if it's a fix
+- Feature complexity
+- Code quality improvements
+
+{chr(10).join(sections)}
+Respond with a JSON object mapping every commit id to its score, for example {{"{ids[0]}": 12}}.
+Respond with ONLY the JSON object."""
+
+        try:
+            response_text = self.request_ai_completion(prompt, max_tokens=12 * len(ids) + 20)
+            # Tolerate prose or code fences around the object
+            start, end = response_text.find("{"), response_text.rfind("}")
+            scores = json.loads(response_text[start:end + 1])
+            if not isinstance(scores, dict):
+                raise ValueError("response is not a JSON object")
+        except AIUnavailableError:
+            scores = {}
         except Exception as e:
-            print(f"AI scoring failed: {e}, using fallback")
-            return min(25, commit_data["total_lines"] // 10)
+            print(f"AI batch scoring failed: {e}, using fallback for {len(ids)} commits")
+            scores = {}
+
+        for i, commit_id in zip(pending, ids):
+            value = scores.get(commit_id)
+            try:
+                if isinstance(value, bool):
+                    raise ValueError
+                score = min(25, max(0, int(value)))
+            except (TypeError, ValueError):
+                if scores:
+                    print(f"AI scoring returned no valid score for {commit_id}, using fallback")
+                self.metrics.count("ai_fallbacks")
+                results[i] = fallback[i]
+                continue
+            results[i] = (score, version)
+            if self.ai_cache:
+                self.ai_cache.put(cache_keys[i], score)
+        return results
+
+    def score_commits_in_batches(self, commits: List[Dict]) -> List[Tuple[int, str]]:
+        """AI-score commits in batches of ai_batch_size, running batches concurrently."""
+        batches = [commits[i:i + self.ai_batch_size] for i in range(0, len(commits), self.ai_batch_size)]
+
+        def score_batch(batch: List[Dict]) -> List[Tuple[int, str]]:
+            with_diff = self._ai_scores_available()
+            return self.calculate_ai_scores_batch([self._get_commit_data(c, with_diff=with_diff) for c in batch])
+
+        with ThreadPoolExecutor(max_workers=self.ai_concurrency) as executor:
+            return [result for batch_results in executor.map(score_batch, batches) for result in batch_results]
+
+    def select_scoring_backend(self, name: str = "auto") -> ScoringBackend:
+        """Build the scoring backend; "auto" picks OpenAI, then Anthropic, then the heuristic."""
+        if name in (None, "auto"):
+            if OPENAI_AVAILABLE and self.openai_api_key:
+                return OpenAIBackend(self.openai_api_key)
+            if ANTHROPIC_AVAILABLE and self.anthropic_api_key:
+                return AnthropicBackend(self.anthropic_api_key)
+            return HeuristicBackend()
+
+        if name not in SCORING_BACKENDS:
+            raise ValueError(f"Unknown scoring backend {name!r} (choose from auto, {', '.join(SCORING_BACKENDS)})")
+        if name == "openai":
+            if not (OPENAI_AVAILABLE and self.openai_api_key):
+                raise ValueError("The openai scoring backend needs the openai package and OPENAI_API_KEY")
+            return OpenAIBackend(self.openai_api_key)
+        if name == "anthropic":
+            if not (ANTHROPIC_AVAILABLE and self.anthropic_api_key):
+                raise ValueError("The anthropic scoring backend needs the anthropic package and ANTHROPIC_API_KEY")
+            return AnthropicBackend(self.anthropic_api_key)
+        return SCORING_BACKENDS[name]()
+
+    def request_ai_completion(self, prompt: str, max_tokens: int = 10) -> str:
+        """Send a prompt to the scoring backend and return the response text.
+
+        Requests are rate limited. 429 responses and transient failures
+        (connection errors, 408, 409 and 5xx, including 529 overloaded) are
+        retried with exponential backoff (or the server's Retry-After) up to
+        ai_max_retries; timeouts are not, since ai_timeout already bounds them.
+        Each attempt is bounded by ai_timeout and by what is left of the run's
+        ai_budget; once the budget is spent or the circuit breaker has opened,
+        AIUnavailableError is raised without sending anything.
+        """
+        attempt = 0
+        while True:
+            timeout = self._ai_call_timeout()
+            if self.ai_rate_limiter:
+                self.ai_rate_limiter.acquire()
+            self.metrics.count("ai_requests")
+            started = time.perf_counter()
+            try:
+                text = self._complete(prompt, max_tokens, timeout)
+                self.metrics.observe_ai_latency(time.perf_counter() - started)
+                self.ai_breaker.record_success()
+                return text
+            except Exception as e:
+                self.metrics.observe_ai_latency(time.perf_counter() - started)
+                if isinstance(e, TimeoutError) or type(e).__name__ == "APITimeoutError":
+                    self.metrics.count("ai_timeouts")
+                status = getattr(e, "status_code", None)
+                retry = self._is_retryable(e) and attempt < self.ai_max_retries
+                delay = self._retry_delay(e, attempt) if retry else 0
+                if retry and self._ai_deadline is not None and time.monotonic() + delay >= self._ai_deadline:
+                    retry = False
+                if not retry:
+                    self.metrics.count("ai_errors")
+                    if self.ai_breaker.record_failure():
+                        print(f"⚡ {self.ai_breaker.reason}, using the heuristic AI score for the remaining commits")
+                    raise
+                self.metrics.count("ai_rate_limited" if status == 429 else "ai_retried")
+                time.sleep(delay)
+                attempt += 1
+
+    def _ai_scores_available(self) -> bool:
+        """Whether a commit can still get a real AI score, and so needs its diff.
+
+        With the breaker open only the AI score cache can provide one; its
+        keys include the diff, so the diff is still read when a cache is open.
+        """
+        return not self.ai_breaker.open or self.ai_cache is not None
+
+    def _ai_call_timeout(self) -> float:
+        """Timeout for the next AI request, or AIUnavailableError if none may be sent."""
+        if not self.ai_breaker.open and self._ai_deadline is not None:
+            remaining = self._ai_deadline - time.monotonic()
+            if remaining <= 0:
+                if self.ai_breaker.trip(f"AI time budget of {self.ai_budget:g}s spent"):
+                    print(f"⏰ {self.ai_breaker.reason}, using the heuristic AI score for the remaining commits")
+            else:
+                return min(self.ai_timeout, remaining) if self.ai_timeout else remaining
+        if self.ai_breaker.open:
+            self.metrics.count("ai_skipped")
+            raise AIUnavailableError(self.ai_breaker.reason)
+        return self.ai_timeout
+
+    def _complete(self, prompt: str, max_tokens: int, timeout: float) -> str:
+        """Run one backend request, hedged with a second copy if it is slow.
+
+        When ai_hedge_after is set and the first request has not answered in
+        that many seconds, the same prompt is sent again (if the rate limiter
+        has a token to spare) and whichever answers first is used.
+        """
+        hedge_after = self.ai_hedge_after
+        if not hedge_after or (timeout and timeout <= hedge_after):
+            return self.scoring_backend.complete(prompt, max_tokens, timeout)
+
+        with self._hedge_lock:
+            if self._hedge_pool is None:
+                # At most two requests per scoring thread
+                self._hedge_pool = ThreadPoolExecutor(max_workers=2 * self.ai_concurrency)
+            pool = self._hedge_pool
+        pending = {pool.submit(self.scoring_backend.complete, prompt, max_tokens, timeout)}
+        done, _ = wait(pending, timeout=hedge_after)
+        if not done and (self.ai_rate_limiter is None or self.ai_rate_limiter.try_acquire()):
+            self.metrics.count("ai_requests")
+            self.metrics.count("ai_hedged")
+            pending.add(pool.submit(self.scoring_backend.complete, prompt, max_tokens, timeout - hedge_after if timeout else None))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Whether a failed request may succeed if sent again.
+
+        The same set the provider SDKs retry by default, less timeouts.
+        """
+        if isinstance(error, TimeoutError) or type(error).__name__ == "APITimeoutError":
+            return False
+        if isinstance(error, ConnectionError) or type(error).__name__ == "APIConnectionError":
+            return True
+        status = getattr(error, "status_code", None)
+        return status in (408, 409, 429) or (status is not None and status >= 500)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Seconds to wait before retrying a rate-limited or failed request."""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return min(60.0, float(retry_after))
+        except (TypeError, ValueError):
+            return min(30.0, 2 ** attempt) + random.uniform(0, 0.5)
+
+    def scoring_fingerprints(self) -> Dict[str, str]:
+        """Version of each scorer, used to invalidate cached scores."""
+        if getattr(self, "_fingerprints", None) is None:
+            fingerprints = {
+                "loc": source_fingerprint(self.calculate_loc_score, LOC_SCORE_TIERS, LOC_DEFAULT_SCORE),
+                "files": source_fingerprint(self.calculate_files_score, FILES_SCORE_TIERS, FILES_DEFAULT_SCORE),
+                "keyword": source_fingerprint(self.calculate_keyword_score, KEYWORD_SCORE_TIERS, KEYWORD_DEFAULT_SCORE)
+            }
 
-    def classify_commit(self, commit: Dict) -> Dict:
-        """Classify a commit and calculate its score."""
-        stats = self.get_commit_stats(commit["hash"])
-        commit_data = {**commit, **stats}
+            fingerprints["ai"] = self.scoring_backend.version
+            self._fingerprints = fingerprints
 
-        # Calculate scores
-        loc_score = self.calculate_loc_score(stats["total_lines"])
-        files_score = self.calculate_files_score(stats["files_changed"])
-        keyword_score = self.calculate_keyword_score(commit["message"])
-        ai_score = self.calculate_ai_score(commit_data)
+        return self._fingerprints
 
-        total_score = loc_score + files_score + keyword_score + ai_score
+    def batch_engine(self) -> BatchScoringEngine:
+        """Return the NumPy engine, or None if the scalar path must be used.
+
+        The engine reads the same score tiers as the scalar scorers; it is
+        not used when a subclass overrides one of the methods it stands in for.
+        """
+        if not (self.vectorized and NUMPY_AVAILABLE):
+            return None
+        if self._batch_engine is None:
+            if any(getattr(type(self), name) is not getattr(CommitAnalyzer, name) for name in BatchScoringEngine.MIRRORS):
+                print("   Scorers are overridden, using scalar scoring")
+                self.vectorized = False
+                return None
+            self._batch_engine = BatchScoringEngine()
+        return self._batch_engine
+
+    def classify_commit(self, commit: CommitRecord) -> Dict:
+        """Classify a commit and calculate its score."""
+        if isinstance(commit, dict):
+            commit = CommitRecord.from_dict(commit)
+        return self._classify_commit(commit)[0].to_dict()
+
+    def _get_commit_data(self, commit: CommitRecord, with_diff: bool) -> Dict:
+        """Collect what the scorers read about a commit, fetching the diff only when requested."""
+        diff = ""
+        if commit.files_changed is None:
+            stats = self.get_commit_stats(commit.hash)
+            commit.files_changed = stats["files_changed"]
+            commit.insertions = stats["insertions"]
+            commit.deletions = stats["deletions"]
+            diff = stats["diff"]
+        # The diff is only read by AI scoring
+        elif with_diff:
+            try:
+                exclude_paths = commit.binary_files if self.skip_binary_diffs else []
+                diff = self.get_commit_diff(commit.hash, exclude_paths)
+            except Exception as e:
+                print(f"Error getting diff for {commit.hash}: {e}")
 
         return {
-            "hash": commit["hash"][:8],
-            "author": commit["author_name"],
-            "email": commit["author_email"],
-            "date": commit["date"].isoformat(),
-            "message": commit["message"],
-            "stats": {
-                "files": stats["files_changed"],
-                "lines": stats["total_lines"],
-                "insertions": stats["insertions"],
-                "deletions": stats["deletions"]
-            },
-            "scores": {
-                "loc": loc_score,
-                "files": files_score,
-                "keyword": keyword_score,
-                "ai": ai_score,
-                "total": total_score
-            },
-            "classification": "significant" if total_score >= self.SIGNIFICANT_THRESHOLD else "simple"
+            "hash": commit.hash,
+            "message": commit.message,
+            "files_changed": commit.files_changed,
+            "insertions": commit.insertions,
+            "deletions": commit.deletions,
+            "total_lines": commit.total_lines,
+            "diff": diff
+        }
+
+    def _classify_commit(self, commit: CommitRecord, cached: Dict = None, ai_result: Tuple[int, str] = None, heuristic_scores: Tuple[int, int, int] = None) -> Tuple[CommitRecord, Dict]:
+        """Classify a commit in place, reusing cached scores whose scorer is unchanged.
+
+        ai_result is an already computed (score, version) pair, e.g. from a
+        batched request, and heuristic_scores the (loc, files, keyword) scores
+        from the batch engine. Returns the classified commit and the scorer
+        version of each score.
+        """
+        cached = cached or {}
+        fingerprints = self.scoring_fingerprints()
+        reuse = {
+            field: cached.get(f"{field}_version") == fingerprints[field]
+            for field in SCORE_FIELDS
         }
 
+        need_ai = not reuse["ai"] and ai_result is None
+        commit_data = self._get_commit_data(commit, with_diff=bool(self.ai_provider) and need_ai and self._ai_scores_available())
+
+        # Calculate scores
+        versions = dict(fingerprints)
+        if heuristic_scores is not None:
+            commit.loc_score, commit.files_score, commit.keyword_score = heuristic_scores
+        else:
+            commit.loc_score = cached["loc"] if reuse["loc"] else self.calculate_loc_score(commit.total_lines)
+            commit.files_score = cached["files"] if reuse["files"] else self.calculate_files_score(commit.files_changed)
+            commit.keyword_score = cached["keyword"] if reuse["keyword"] else self.calculate_keyword_score(commit.message)
+        if reuse["ai"]:
+            commit.ai_score = cached["ai"]
+        elif ai_result is not None:
+            commit.ai_score, versions["ai"] = ai_result
+        else:
+            commit.ai_score, versions["ai"] = self._calculate_ai_score(commit_data)
+
+        commit.classification = "significant" if commit.total_score >= self.SIGNIFICANT_THRESHOLD else "simple"
+        return commit, versions
+
     def get_time_period(self, date: datetime, period: str) -> str:
         """Get time period identifier for a date."""
         if period == "weekly":
@@ -391,8 +2452,12 @@ Respond with ONLY a number from 0-25."""
 
         return period_start, period_end
 
-    def aggregate_by_period(self, classified_commits: List[Dict]) -> Dict:
+    def aggregate_by_period(self, classified_commits: List[CommitRecord]) -> Dict:
         """Aggregate commits by time period and author."""
+        engine = self.batch_engine()
+        if engine is not None:
+            return engine.aggregate(classified_commits)[0]
+
         periods = {
             "weekly": defaultdict(lambda: defaultdict(list)),
             "monthly": defaultdict(lambda: defaultdict(list)),
@@ -400,8 +2465,8 @@ Respond with ONLY a number from 0-25."""
         }
 
         for commit in classified_commits:
-            date = datetime.fromisoformat(commit["date"])
-            author = commit["author"]
+            date = commit.date
+            author = commit.author
 
             for period_type in ["weekly", "monthly", "quarterly"]:
                 period = self.get_time_period(date, period_type)
@@ -409,9 +2474,117 @@ Respond with ONLY a number from 0-25."""
 
         return periods
 
-    def generate_leaderboard(self, aggregated_data: Dict) -> Dict:
-        """Generate ranked leaderboards for each time period."""
+    def build_contributor(self, author: str, commits: List[CommitRecord], period_start: datetime, period_end: datetime, commit_dicts: Dict[str, Dict] = None, totals: Tuple[int, int, int] = None) -> Dict:
+        """Summarize one author's commits in a period into a leaderboard entry.
+
+        commit_dicts memoizes output dicts so a commit listed under several
+        period types is converted once. totals are precomputed (commits,
+        significant, score) sums from the batch engine.
+        """
+        if commit_dicts is None:
+            commit_dicts = {}
+        if totals is not None:
+            total_commits, significant, commit_score = totals
+        else:
+            total_commits = len(commits)
+            significant = sum(1 for c in commits if c.classification == "significant")
+            commit_score = sum(c.total_score for c in commits)
+
+        # Get email (use first commit's email)
+        email = commits[0].email if commits else ""
+
+        commit_entries = []
+        for commit in commits:
+            if commit.hash not in commit_dicts:
+                commit_dicts[commit.hash] = commit.to_dict()
+            commit_entries.append(commit_dicts[commit.hash])
+
+        contributor = self._contributor_summary(author, email, total_commits, significant, commit_score, period_start, period_end)
+        contributor["commits"] = commit_entries
+        return contributor
+
+    def _contributor_summary(self, author: str, email: str, total_commits: int, significant: int, commit_score: int, period_start: datetime, period_end: datetime) -> Dict:
+        """Leaderboard entry for an author's totals in a period, without the commit list."""
+        simple = total_commits - significant
+        avg_score = commit_score / total_commits if total_commits > 0 else 0
+
+        # Get manual contribution score FOR THIS PERIOD
+        manual_score, manual_notes = self.get_manual_score_for_period(author, period_start, period_end)
+
+        # Calculate total score (commits + other contributions)
+        total_score = commit_score + manual_score
+
+        return {
+            "name": author,
+            "email": email,
+            "total_commits": total_commits,
+            "significant_commits": significant,
+            "simple_commits": simple,
+            "significance_ratio": significant / total_commits if total_commits > 0 else 0,
+            "commit_score": commit_score,  # Score from commits only
+            "avg_score": round(avg_score, 2),
+            "additional_contribution_score": manual_score,
+            "additional_contribution_notes": manual_notes,
+            "total_score": total_score  # Total score (commits + other contrib)
+        }
+
+    def rank_date_range(self, index: DateRangeIndex, start: date, end: date) -> List[Dict]:
+        """Rank contributors over the days from start to end inclusive.
+
+        Entries have the same fields, ranks and tiers as a period in
+        generate_leaderboard, but no commit list; manual contributions
+        overlapping the range are included.
+        """
+        period_start = datetime.combine(start, day_time.min)
+        period_end = datetime.combine(end, day_time(23, 59, 59))
+        contributors = [
+            self._contributor_summary(author, email, total_commits, significant, commit_score, period_start, period_end)
+            for author, email, total_commits, significant, commit_score in index.query(start, end)
+        ]
+        self.rank_contributors(contributors)
+        return contributors
+
+    def query_date_range(self, output_file: str, start: date, end: date) -> List[Dict]:
+        """Rank contributors over a date range using the commits of an existing output file."""
+        with open(output_file) as f:
+            output = json.load(f)
+        return self.rank_date_range(DateRangeIndex.from_output(output), start, end)
+
+    def rank_contributors(self, contributors: List[Dict]):
+        """Sort a period's contributors in place and assign ranks and tiers."""
+        # Sort by TOTAL score (commits + other contrib), then by total commits
+        contributors.sort(key=lambda x: (x["total_score"], x["total_commits"]), reverse=True)
+
+        # Assign tiers instead of ranks
+        # T0: Top 5 (Elite)
+        # T1: Next 7 (positions 6-12) (Advanced)
+        # T2: Next 10 (positions 13-22) (Intermediate)
+        # T3+: Everyone else (Contributing)
+        for i, contributor in enumerate(contributors, 1):
+            contributor["rank"] = i  # Keep numeric rank for internal sorting
+            if i <= 5:
+                contributor["tier"] = "T0"
+                contributor["tier_name"] = "Elite"
+            elif i <= 12:
+                contributor["tier"] = "T1"
+                contributor["tier_name"] = "Advanced"
+            elif i <= 22:
+                contributor["tier"] = "T2"
+                contributor["tier_name"] = "Intermediate"
+            else:
+                contributor["tier"] = "T3"
+                contributor["tier_name"] = "Contributing"
+
+    def generate_leaderboard(self, aggregated_data: Dict, totals: Dict = None, commit_dicts: Dict = None) -> Dict:
+        """Generate ranked leaderboards for each time period.
+
+        totals optionally maps (period_type, period, author) to precomputed
+        (commits, significant, score) sums; commit_dicts collects the output
+        dict of every commit by hash.
+        """
         leaderboards = {}
+        commit_dicts = {} if commit_dicts is None else commit_dicts
+        totals = totals or {}
 
         for period_type, periods in aggregated_data.items():
             period_leaderboards = {}
@@ -420,61 +2593,14 @@ Respond with ONLY a number from 0-25."""
                 # Get period boundaries for filtering manual contributions
                 period_start, period_end = self.parse_period_bounds(period, period_type)
 
-                contributors = []
-
-                for author, commits in authors.items():
-                    total_commits = len(commits)
-                    significant = sum(1 for c in commits if c["classification"] == "significant")
-                    simple = total_commits - significant
-                    commit_score = sum(c["scores"]["total"] for c in commits)
-                    avg_score = commit_score / total_commits if total_commits > 0 else 0
-
-                    # Get email (use first commit's email)
-                    email = commits[0]["email"] if commits else ""
-
-                    # Get manual contribution score FOR THIS PERIOD
-                    manual_score, manual_notes = self.get_manual_score_for_period(author, period_start, period_end)
-
-                    # Calculate total score (commits + other contributions)
-                    total_score = commit_score + manual_score
-
-                    contributors.append({
-                        "name": author,
-                        "email": email,
-                        "total_commits": total_commits,
-                        "significant_commits": significant,
-                        "simple_commits": simple,
-                        "significance_ratio": significant / total_commits if total_commits > 0 else 0,
-                        "commit_score": commit_score,  # Score from commits only
-                        "avg_score": round(avg_score, 2),
-                        "additional_contribution_score": manual_score,
-                        "additional_contribution_notes": manual_notes,
-                        "total_score": total_score,  # Total score (commits + other contrib)
-                        "commits": commits
-                    })
-
-                # Sort by TOTAL score (commits + other contrib), then by total commits
-                contributors.sort(key=lambda x: (x["total_score"], x["total_commits"]), reverse=True)
-
-                # Assign tiers instead of ranks
-                # T0: Top 5 (Elite)
-                # T1: Next 7 (positions 6-12) (Advanced)
-                # T2: Next 10 (positions 13-22) (Intermediate)
-                # T3+: Everyone else (Contributing)
-                for i, contributor in enumerate(contributors, 1):
-                    contributor["rank"] = i  # Keep numeric rank for internal sorting
-                    if i <= 5:
-                        contributor["tier"] = "T0"
-                        contributor["tier_name"] = "Elite"
-                    elif i <= 12:
-                        contributor["tier"] = "T1"
-                        contributor["tier_name"] = "Advanced"
-                    elif i <= 22:
-                        contributor["tier"] = "T2"
-                        contributor["tier_name"] = "Intermediate"
-                    else:
-                        contributor["tier"] = "T3"
-                        contributor["tier_name"] = "Contributing"
+                contributors = [
+                    self.build_contributor(
+                        author, commits, period_start, period_end, commit_dicts,
+                        totals.get((period_type, period, author))
+                    )
+                    for author, commits in authors.items()
+                ]
+                self.rank_contributors(contributors)
 
                 period_leaderboards[period] = contributors
 
@@ -482,30 +2608,299 @@ Respond with ONLY a number from 0-25."""
 
         return leaderboards
 
-    def analyze(self, output_file: str = "leaderboard-data.json"):
+    def update_leaderboards(self, state: LeaderboardState, positions: Dict[str, int], added: List[CommitRecord], removed: List[CommitRecord], rescored: List[Tuple[CommitRecord, bool, int]]) -> bool:
+        """Apply changed commits and manual contributions to resident leaderboards.
+
+        added and removed are the commits that entered and left the window,
+        rescored holds re-classified commits with their previous
+        (significant, score). Totals are adjusted by the difference, and only
+        the periods these commits fall in, plus those of authors whose manual
+        contributions changed, are regrouped and re-ranked. positions (hash to
+        index in history order) keep commits, authors and periods in the order
+        a full rebuild gives. Returns whether the leaderboards changed.
+        """
+        touched = set()
+        grown = defaultdict(list)
+        shrunk = set()
+
+        def adjust(commit: CommitRecord, commits: int, significant: int, score: int) -> List[Tuple[str, str, str]]:
+            keys = []
+            for period_type in state.periods:
+                key = (period_type, self.get_time_period(commit.date, period_type), commit.author)
+                count, significant_count, total = state.totals.get(key, (0, 0, 0))
+                state.totals[key] = (count + commits, significant_count + significant, total + score)
+                touched.add(key)
+                keys.append(key)
+            return keys
+
+        removed_hashes = set()
+        for commit in removed:
+            shrunk.update(adjust(commit, -1, -(commit.classification == "significant"), -commit.total_score))
+            removed_hashes.add(commit.hash)
+            state.commit_dicts.pop(commit.hash, None)
+        for commit in added:
+            for key in adjust(commit, 1, commit.classification == "significant", commit.total_score):
+                grown[key].append(commit)
+        for commit, was_significant, previous_score in rescored:
+            adjust(commit, 0, (commit.classification == "significant") - was_significant, commit.total_score - previous_score)
+            state.commit_dicts.pop(commit.hash, None)
+
+        # Regroup only the (period, author) lists that gained or lost commits
+        for key in shrunk | set(grown):
+            period_type, period, author = key
+            authors = state.periods[period_type].get(period)
+            if authors is None:
+                authors = state.periods[period_type][period] = {}
+            commits = authors.get(author, [])
+            if key in shrunk:
+                commits = [commit for commit in commits if commit.hash not in removed_hashes]
+            if key in grown:
+                commits = sorted(commits + grown[key], key=lambda commit: positions[commit.hash])
+            if commits:
+                authors[author] = commits
+            else:
+                authors.pop(author, None)
+                del state.totals[key]
+                if not authors:
+                    del state.periods[period_type][period]
+
+        # A changed manual contribution changes the author's entry in every period they appear in
+        manual_authors = {
+            author for author in set(state.manual_contributions) | set(self.manual_contributions)
+            if state.manual_contributions.get(author) != self.manual_contributions.get(author)
+        }
+        state.manual_contributions = self.manual_contributions
+        if manual_authors:
+            for period_type, periods in state.periods.items():
+                for period, authors in periods.items():
+                    touched.update((period_type, period, author) for author in manual_authors if author in authors)
+
+        leaderboards = {period_type: dict(periods) for period_type, periods in state.leaderboards.items()}
+        changed = False
+        for period_type, period in {(period_type, period) for period_type, period, _ in touched}:
+            authors = state.periods[period_type].get(period)
+            if not authors:
+                changed = leaderboards[period_type].pop(period, None) is not None or changed
+                continue
+            # Authors in order of their first commit in history, as aggregate_by_period lists them
+            ordered = sorted(authors.items(), key=lambda item: positions[item[1][0].hash])
+            authors.clear()
+            authors.update(ordered)
+
+            previous = {entry["name"]: entry for entry in leaderboards[period_type].get(period, ())}
+            period_start, period_end = self.parse_period_bounds(period, period_type)
+            contributors = [
+                self.build_contributor(
+                    author, commits, period_start, period_end, state.commit_dicts, state.totals[(period_type, period, author)]
+                )
+                if (period_type, period, author) in touched or author not in previous
+                # Unchanged entries only get a new rank
+                else dict(previous[author])
+                for author, commits in authors.items()
+            ]
+            self.rank_contributors(contributors)
+            changed = changed or contributors != leaderboards[period_type].get(period)
+            leaderboards[period_type][period] = contributors
+
+        # Periods in order of their newest commit
+        for period_type, periods in state.periods.items():
+            order = sorted(periods, key=lambda period: min(positions[commits[0].hash] for commits in periods[period].values()))
+            if order != list(leaderboards[period_type]):
+                changed = True
+                leaderboards[period_type] = {period: leaderboards[period_type][period] for period in order}
+
+        state.leaderboards = leaderboards
+        return changed
+
+    def iter_classified_commits(self, commits: Iterable[CommitRecord], cache: ClassificationCache = None, total: int = None) -> Iterator[Tuple[CommitRecord, Dict]]:
+        """Classify a stream of commits, yielding (commit, versions) in input order.
+
+        Commits are taken from the stream a chunk at a time, so only one
+        chunk is held in memory however long the stream is.
+        """
+        if self.ai_provider and self.ai_cache_path:
+            self.ai_cache = AIScoreCache(self.ai_cache_path, self.ai_cache_max_entries)
+        self.ai_breaker.reset()
+        self._ai_deadline = time.monotonic() + self.ai_budget if self.ai_budget else None
+        engine = self.batch_engine()
+        batched_ai = bool(self.ai_provider) and self.ai_batch_size > 1
+        # With batching the AI scores are ready before a chunk is classified, so the remaining work is local
+        workers = self.ai_concurrency if self.ai_provider and not batched_ai else 1
+        # Whole batches per chunk
+        chunk_size = -(-max(CLASSIFY_CHUNK_SIZE, self.ai_batch_size * self.ai_concurrency) // self.ai_batch_size) * self.ai_batch_size
+        ai_version = self.scoring_fingerprints()["ai"]
+        stream = iter(commits)
+        processed = 0
+        reused = 0
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                while True:
+                    chunk = list(islice(stream, chunk_size))
+                    if not chunk:
+                        break
+                    # SQLite connections stay on this thread, so look up cached scores up front
+                    cached_scores = [cache.get(commit.hash) if cache else {} for commit in chunk]
+
+                    ai_results = [None] * len(chunk)
+                    if batched_ai:
+                        pending = [i for i, cached in enumerate(cached_scores) if cached.get("ai_version") != ai_version]
+                        if pending:
+                            print(f"   AI scoring {len(pending)} commits in batches of {self.ai_batch_size}")
+                            for i, result in zip(pending, self.score_commits_in_batches([chunk[i] for i in pending])):
+                                ai_results[i] = result
+
+                    heuristics = [None] * len(chunk)
+                    if engine is not None and all(c.files_changed is not None for c in chunk):
+                        loc_scores, files_scores, keyword_scores = engine.heuristic_scores(
+                            [c.total_lines for c in chunk],
+                            [c.files_changed for c in chunk],
+                            [c.message for c in chunk]
+                        )
+                        heuristics = list(zip(loc_scores.tolist(), files_scores.tolist(), keyword_scores.tolist()))
+
+                    # map() yields results in commit order regardless of completion order
+                    results = executor.map(self._classify_commit, chunk, cached_scores, ai_results, heuristics)
+                    for commit, cached, (classified, versions) in zip(chunk, cached_scores, results):
+                        processed += 1
+                        if versions["ai"] == "fallback":
+                            self.fallback_commits.add(commit.hash)
+                        else:
+                            self.fallback_commits.discard(commit.hash)
+                        if processed % 10 == 0:
+                            print(f"   Progress: {processed}/{total}" if total is not None else f"   Progress: {processed}")
+                        if cache is not None:
+                            if cached and all(cached[f"{field}_version"] == versions[field] for field in SCORE_FIELDS):
+                                reused += 1
+                            else:
+                                cache.put(commit.hash, classified.scores(), versions)
+                                # Keep paid AI scores even if the run is interrupted
+                                if (processed - reused) % 50 == 0:
+                                    cache.commit()
+                        yield classified, versions
+        finally:
+            if cache is not None:
+                cache.commit()
+            ai_cache, self.ai_cache = self.ai_cache, None
+            if ai_cache is not None:
+                ai_cache.close()
+                self.last_ai_cache_stats = (ai_cache.hits, ai_cache.misses)
+                self.metrics.count("ai_cache_hits", ai_cache.hits)
+                self.metrics.count("ai_cache_misses", ai_cache.misses)
+            if self.git_reader is not None:
+                self.git_reader.close()
+            with self._hedge_lock:
+                hedge_pool, self._hedge_pool = self._hedge_pool, None
+            if hedge_pool is not None:
+                # Losing hedged requests finish (or time out) on their own
+                hedge_pool.shutdown(wait=False)
+        if cache is not None:
+            print(f"   Reused {reused} cached classifications, scored {processed - reused}")
+
+    def analyze(self, output_file: str = "leaderboard-data.json", days: int = 365):
         """Main analysis pipeline."""
-        print("🔍 Fetching commits from last 6 months...")
-        commits = self.get_commits_since(days=365)
-        print(f"   Found {len(commits)} commits")
+        self.metrics.reset()
+        output_path = Path(output_file)
+        cache = ClassificationCache(self.cache_path) if self.cache_path else None
+        try:
+            output, classified_commits, _ = self._analyze(output_path, days, cache)
+        finally:
+            if cache is not None:
+                cache.close()
 
-        print("\n📊 Classifying commits...")
-        classified_commits = []
-        for i, commit in enumerate(commits, 1):
-            if i % 10 == 0:
-                print(f"   Progress: {i}/{len(commits)}")
-            classified_commits.append(self.classify_commit(commit))
+        self._report(output_path, classified_commits)
+        return output
 
+    def _analyze(self, output_path: Path, days: int, cache: ClassificationCache) -> Tuple[Dict, List[CommitRecord], LeaderboardState]:
+        """Classify the history, build the leaderboards and write the output.
+
+        Returns the output, the classified commits in history order and the
+        leaderboard state watch mode keeps up to date.
+        """
+        checkpoint = None
+        if self.checkpoint_path:
+            checkpoint = ClassificationCheckpoint(self.checkpoint_path, {
+                "repo": str(self.repo_path.resolve()),
+                "fingerprints": self.scoring_fingerprints()
+            })
+        self.last_ai_cache_stats = None
+        self.fallback_commits = set()
+        try:
+            resumed = checkpoint.load() if checkpoint is not None else {}
+            # Fallback AI scores are retried rather than resumed
+            done = {commit_hash for commit_hash, (_, versions) in resumed.items() if versions["ai"] != "fallback"}
+            del resumed
+            if done:
+                print(f"♻️  Resuming from {self.checkpoint_path}: {len(done)} commits already classified")
+
+            # Extraction feeds classification directly; classified commits go
+            # to the checkpoint, so only their hashes are kept meanwhile
+            history_order = []
+            classified_by_hash = {}
+
+            def unclassified_commits() -> Iterator[CommitRecord]:
+                for commit in self.metrics.timed(self.iter_commits_with_stats(days=days), "extract"):
+                    history_order.append(commit.hash)
+                    if commit.hash not in done:
+                        yield commit
+
+            print(f"🔍 Fetching and classifying commits from last {days} days...")
+            with self.metrics.stage("classify", exclude=("extract",)):
+                for commit, versions in self.iter_classified_commits(unclassified_commits(), cache):
+                    if checkpoint is not None:
+                        checkpoint.append(commit, versions)
+                    else:
+                        classified_by_hash[commit.hash] = commit
+            self.metrics.count("commits", len(history_order))
+            print(f"   Found {len(history_order)} commits")
+
+            if checkpoint is not None:
+                # Later lines replace earlier ones, e.g. a retried fallback score
+                classified_by_hash = {commit.hash: commit for commit, _ in checkpoint.records()}
+            classified_commits = [classified_by_hash[commit_hash] for commit_hash in history_order]
+            del classified_by_hash
+
+            state = self._build_leaderboards(classified_commits)
+            output = self._write_output(output_path, classified_commits, state.leaderboards, days)
+            if checkpoint is not None:
+                # The output now holds everything the checkpoint did
+                checkpoint.remove()
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+        return output, classified_commits, state
+
+    def _build_leaderboards(self, classified_commits: List[CommitRecord]) -> LeaderboardState:
+        """Aggregate the classified commits by period and rank each period."""
         print("\n📅 Aggregating by time period...")
-        aggregated = self.aggregate_by_period(classified_commits)
+        with self.metrics.stage("aggregate"):
+            engine = self.batch_engine()
+            if engine is not None:
+                aggregated, totals = engine.aggregate(classified_commits)
+            else:
+                aggregated = self.aggregate_by_period(classified_commits)
+                totals = {
+                    (period_type, period, author): (
+                        len(commits), sum(1 for c in commits if c.classification == "significant"), sum(c.total_score for c in commits)
+                    )
+                    for period_type, periods in aggregated.items()
+                    for period, authors in periods.items()
+                    for author, commits in authors.items()
+                }
 
         print("\n🏆 Generating leaderboards...")
-        leaderboards = self.generate_leaderboard(aggregated)
+        with self.metrics.stage("generate_leaderboard"):
+            commit_dicts = {}
+            leaderboards = self.generate_leaderboard(aggregated, totals, commit_dicts)
+        return LeaderboardState(aggregated, totals, commit_dicts, leaderboards, self.manual_contributions)
 
+    def _write_output(self, output_path: Path, classified_commits: List[CommitRecord], leaderboards: Dict, days: int) -> Dict:
+        """Write the leaderboard output (and shards when enabled)."""
         # Prepare output
         output = {
             "last_updated": datetime.now().isoformat(),
             "total_commits_analyzed": len(classified_commits),
-            "analysis_period_days": 365,
+            "analysis_period_days": days,
             "leaderboards": leaderboards,
             "metadata": {
                 "scoring_system": {
@@ -520,16 +2915,146 @@ Respond with ONLY a number from 0-25."""
         }
 
         # Save to file
+        with self.metrics.stage("write_output"):
+            content = json.dumps(output, indent=2)
+            with open(output_path, "w") as f:
+                f.write(content)
+
+        if self.server is not None:
+            with self.metrics.stage("publish"):
+                self.server.publish(output, content.encode())
+
+        if self.shard_dir:
+            with self.metrics.stage("write_shards"):
+                written, skipped = write_sharded_output(output, self.shard_dir)
+            print(f"\n🗂️  Wrote {written} shards to {self.shard_dir} ({skipped} unchanged)")
+        return output
+
+    def watch(self, output_file: str = "leaderboard-data.json", days: int = 365, interval: float = 60.0, pull: bool = False, max_polls: int = None):
+        """Stay resident and refresh the output whenever the repository changes.
+
+        The first pass is a normal analysis. After that the repository is
+        polled every `interval` seconds with a single `git rev-parse HEAD`
+        (after `git pull --ff-only` when pull is set). A new HEAD, a new day
+        (which moves the analysis window) or an edited manual contributions
+        file triggers a refresh: only commits not seen before are extracted
+        and classified, only the periods touched by new, removed or re-scored
+        commits or by changed manual contributions are re-ranked, and the
+        output is rewritten only if the leaderboards changed. Stops after
+        max_polls polls, or on Ctrl-C.
+        """
         output_path = Path(output_file)
-        with open(output_path, "w") as f:
-            json.dump(output, f, indent=2)
+        cache = ClassificationCache(self.cache_path) if self.cache_path else None
+        try:
+            self.metrics.reset()
+            snapshot = self._watch_snapshot(days)
+            output, classified_commits, state = self._analyze(output_path, days, cache)
+            self._report(output_path, classified_commits)
+            known = {commit.hash: commit for commit in classified_commits}
+            del output, classified_commits
+
+            print(f"\n👀 Watching {self.repo_path} every {interval:g}s (Ctrl-C to stop)")
+            polls = 0
+            while max_polls is None or polls < max_polls:
+                time.sleep(interval)
+                polls += 1
+                if pull:
+                    try:
+                        self.run_git_command(["git", "pull", "--ff-only", "--quiet"])
+                    except subprocess.CalledProcessError as e:
+                        print(f"   git pull failed: {e.stderr.strip() if e.stderr else e}")
+
+                current = self._watch_snapshot(days)
+                if current == snapshot and not self.fallback_commits:
+                    continue
+
+                self.metrics.reset()
+                self.last_ai_cache_stats = None
+                if current != snapshot:
+                    print(f"\n🔄 {datetime.now():%Y-%m-%d %H:%M:%S} change detected at {current[0][:8]}")
+                else:
+                    print(f"\n🔄 {datetime.now():%Y-%m-%d %H:%M:%S} retrying {len(self.fallback_commits)} fallback AI scores")
+                snapshot = current
+                known, changed = self._refresh(output_path, days, cache, known, state)
+                if changed:
+                    self._report(output_path, list(known.values()))
+                else:
+                    print("   Leaderboards unchanged, output left as is")
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+        finally:
+            self.scoring_backend.close()
+            if cache is not None:
+                cache.close()
+
+    def _watch_snapshot(self, days: int) -> Tuple[str, str, float]:
+        """What a refresh depends on: HEAD, the window start and the manual contributions file."""
+        head = self.run_git_command(["git", "rev-parse", "HEAD"])
+        since_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        try:
+            manual_mtime = self.manual_contributions_path.stat().st_mtime
+        except OSError:
+            manual_mtime = None
+        return head, since_date, manual_mtime
+
+    def _refresh(self, output_path: Path, days: int, cache: ClassificationCache, known: Dict[str, CommitRecord], state: LeaderboardState) -> Tuple[Dict[str, CommitRecord], bool]:
+        """Bring resident state up to date with the repository.
+
+        Returns the classified commits by hash in history order and whether
+        the output was rewritten. state is updated in place.
+        """
+        since_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        with self.metrics.stage("extract"):
+            # Cheap (no diffs), and the order git log uses
+            hashes = self.run_git_command(["git", "rev-list", f"--since={since_date}", "--no-merges", "HEAD"]).split()
+            positions = {commit_hash: position for position, commit_hash in enumerate(hashes)}
+            new_hashes = [commit_hash for commit_hash in hashes if commit_hash not in known]
+            new_commits = []
+            if new_hashes:
+                self.metrics.count("git_subprocesses")
+                new_commits = extract_commit_range(self.repo_path, new_hashes)
+        removed = [commit for commit_hash, commit in known.items() if commit_hash not in positions]
+        print(f"   {len(new_commits)} new commits, {len(removed)} left the window")
+
+        # Commits that got the fallback AI score are scored again
+        self.fallback_commits.intersection_update(hashes)
+        retried = [known[commit_hash] for commit_hash in hashes if commit_hash in self.fallback_commits and commit_hash in known]
+        if retried:
+            print(f"   Retrying AI scores of {len(retried)} commits that got the fallback")
+        rescored = [(commit, commit.classification == "significant", commit.total_score) for commit in retried]
+
+        if new_commits or retried:
+            with self.metrics.stage("classify"):
+                for commit, _ in self.iter_classified_commits(new_commits + retried, cache):
+                    known[commit.hash] = commit
+        known = {commit_hash: known[commit_hash] for commit_hash in hashes if commit_hash in known}
+        self.metrics.count("commits", len(known))
 
+        self.manual_contributions = self.load_manual_contributions()
+        self.manual_index = ManualContributionIndex(self.manual_contributions)
+
+        print("\n🏆 Updating changed periods...")
+        with self.metrics.stage("generate_leaderboard"):
+            changed = self.update_leaderboards(state, positions, new_commits, removed, rescored)
+        if not changed and output_path.exists():
+            return known, False
+        self._write_output(output_path, list(known.values()), state.leaderboards, days)
+        return known, True
+
+    def _report(self, output_path: Path, classified_commits: List[CommitRecord]):
+        """Print the run summary and write the run metrics."""
         print(f"\n✅ Analysis complete! Results saved to {output_path}")
         print(f"   Total commits: {len(classified_commits)}")
-        print(f"   Significant: {sum(1 for c in classified_commits if c['classification'] == 'significant')}")
-        print(f"   Simple: {sum(1 for c in classified_commits if c['classification'] == 'simple')}")
+        print(f"   Significant: {sum(1 for c in classified_commits if c.classification == 'significant')}")
+        print(f"   Simple: {sum(1 for c in classified_commits if c.classification == 'simple')}")
+        if self.last_ai_cache_stats is not None:
+            print(f"   AI score cache: {self.last_ai_cache_stats[0]} hits, {self.last_ai_cache_stats[1]} misses")
+        if self.fallback_commits:
+            print(f"   Fallback AI scores: {len(self.fallback_commits)} commits, scored again by the next run")
 
-        return output
+        if self.write_metrics:
+            json_path, prom_path = self.metrics.write(output_path)
+            print(f"   Metrics: {json_path}, {prom_path}")
 
 
 if __name__ == "__main__":
@@ -539,8 +3064,95 @@ if __name__ == "__main__":
     parser.add_argument("--repo", default="../LMCache", help="Path to LMCache repository")
     parser.add_argument("--output", default="leaderboard-data.json", help="Output JSON file")
     parser.add_argument("--api-key", help="Anthropic API key (or set ANTHROPIC_API_KEY env var)")
+    parser.add_argument("--days", type=int, default=365, help="Number of days of history to analyze")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to extract commit history in parallel")
+    parser.add_argument("--cache", default="classification-cache.db", help="SQLite file storing commit scores between runs")
+    parser.add_argument("--ai-cache", default="ai-score-cache.db", help="SQLite file storing AI scores by prompt content")
+    parser.add_argument("--ai-cache-max-entries", type=int, default=50000, help="AI score cache size; least recently used entries are evicted")
+    parser.add_argument("--no-cache", action="store_true", help="Re-score every commit without reading or writing the caches")
+    parser.add_argument("--diff-preview-chars", type=int, default=4000, help="Characters of diff read per commit for AI scoring")
+    parser.add_argument("--diff-exclude", action="append", default=[], metavar="PATTERN", help="Leave matching paths (e.g. '*.lock') out of AI diff previews; repeatable")
+    parser.add_argument("--skip-binary-diffs", action="store_true", help="Leave binary files out of AI diff previews")
+    parser.add_argument("--shard-dir", help="Also write the output as a manifest plus per-period shards in this directory")
+    parser.add_argument("--checkpoint", help="NDJSON file classified commits are streamed to, so an interrupted run can resume (default: <output>.checkpoint.ndjson)")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Do not write a checkpoint")
+    parser.add_argument("--from", dest="from_date", type=date.fromisoformat, metavar="YYYY-MM-DD", help="Rank contributors from this date using the existing --output file instead of analyzing")
+    parser.add_argument("--to", dest="to_date", type=date.fromisoformat, metavar="YYYY-MM-DD", help="Last day of the --from range (default: today)")
+    parser.add_argument("--json", action="store_true", help="Print the --from/--to ranking as JSON")
+    parser.add_argument("--watch", action="store_true", help="Keep running and refresh the output whenever the repository changes")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between repository polls in --watch mode")
+    parser.add_argument("--pull", action="store_true", help="Run git pull --ff-only before each poll in --watch mode")
+    parser.add_argument("--serve", action="store_true", help="Serve the output over HTTP; with --watch it is updated in memory, otherwise reloaded when the file changes")
+    parser.add_argument("--host", default="127.0.0.1", help="Address --serve listens on")
+    parser.add_argument("--port", type=int, default=8000, help="Port --serve listens on")
+    parser.add_argument("--no-metrics", action="store_true", help="Do not write <output>.metrics.json and <output>.prom")
+    parser.add_argument("--no-vectorized", action="store_true", help="Score and bucket commits one at a time instead of with NumPy")
+    parser.add_argument("--no-persistent-git", action="store_true", help="Start a git process per query instead of keeping readers open")
+    parser.add_argument("--ai-concurrency", type=int, default=4, help="Maximum number of AI scoring requests in flight")
+    parser.add_argument("--ai-rate-limit", type=float, default=5.0, help="Maximum AI scoring requests per second (0 disables the limit)")
+    parser.add_argument("--scoring-backend", choices=["auto", *SCORING_BACKENDS], default="auto", help="Source of AI scores: auto uses OpenAI, then Anthropic, then the heuristic; stub is an offline stand-in for testing")
+    parser.add_argument("--ai-timeout", type=float, default=30.0, help="Seconds a single AI request may take (0 disables the timeout)")
+    parser.add_argument("--ai-budget", type=float, help="Seconds of AI scoring per run; later commits get the heuristic fallback and are scored by the next run")
+    parser.add_argument("--ai-hedge-after", type=float, help="Send a second copy of an AI request that has not answered after this many seconds")
+    parser.add_argument("--ai-breaker-threshold", type=int, default=5, help="Consecutive AI failures after which the rest of the run uses the heuristic (0 never stops)")
+    parser.add_argument("--ai-batch-size", type=int, default=1, help="Commits scored per AI request (e.g. 10 for full rebuilds)")
 
     args = parser.parse_args()
 
-    analyzer = CommitAnalyzer(args.repo, args.api_key)
-    analyzer.analyze(args.output)
+    try:
+        analyzer = CommitAnalyzer(
+            args.repo,
+            args.api_key,
+            cache_path=None if args.no_cache else args.cache,
+            ai_cache_path=None if args.no_cache else args.ai_cache,
+            ai_cache_max_entries=args.ai_cache_max_entries,
+            ai_concurrency=args.ai_concurrency,
+            ai_rate_limit=args.ai_rate_limit,
+            ai_batch_size=args.ai_batch_size,
+            diff_preview_chars=args.diff_preview_chars,
+            diff_exclude=args.diff_exclude,
+            skip_binary_diffs=args.skip_binary_diffs,
+            persistent_git=not args.no_persistent_git,
+            extract_workers=args.workers,
+            shard_dir=args.shard_dir,
+            vectorized=not args.no_vectorized,
+            write_metrics=not args.no_metrics,
+            checkpoint_path=None if args.no_checkpoint else (
+                args.checkpoint or str(Path(args.output).with_name(Path(args.output).stem + ".checkpoint.ndjson"))
+            ),
+            scoring_backend=args.scoring_backend,
+            ai_timeout=args.ai_timeout,
+            ai_budget=args.ai_budget,
+            ai_hedge_after=args.ai_hedge_after,
+            ai_breaker_threshold=args.ai_breaker_threshold
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    if args.from_date:
+        to_date = args.to_date or date.today()
+        contributors = analyzer.query_date_range(args.output, args.from_date, to_date)
+        if args.json:
+            print(json.dumps(contributors, indent=2))
+        else:
+            print(f"🏆 {args.from_date} to {to_date}: {len(contributors)} contributors")
+            for c in contributors:
+                print(f"   {c['rank']:>3}. [{c['tier']}] {c['name']:<30} {c['total_score']:>6} points, "
+                      f"{c['total_commits']} commits ({c['significant_commits']} significant)")
+    elif args.serve:
+        server = LeaderboardServer(args.host, args.port, Path(args.output).name)
+        host, port = server.address
+        print(f"🌐 Serving {args.output} on http://{host}:{port}/ ({'gzip, br' if BROTLI_AVAILABLE else 'gzip'})")
+        if args.watch:
+            # Serve the previous output until the first pass has finished
+            if Path(args.output).exists():
+                server.load(Path(args.output))
+            analyzer.server = server
+            server.start()
+            analyzer.watch(args.output, days=args.days, interval=args.interval, pull=args.pull)
+        else:
+            server.follow(Path(args.output))
+            server.serve_forever()
+    elif args.watch:
+        analyzer.watch(args.output, days=args.days, interval=args.interval, pull=args.pull)
+    else:
+        analyzer.analyze(args.output, days=args.days)
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+LMCache Leaderboard Benchmark
+Times each analyzer stage against a synthetic git repository and a local stub LLM endpoint.
+"""
+
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import analyze_commits
+from analyze_commits import CommitAnalyzer, StubBackend
+
+MESSAGE_TEMPLATES = [
+    "feat: add {topic} support",
+    "fix: handle {topic} edge case",
+    "refactor: simplify {topic}",
+    "test: cover {topic}",
+    "chore: bump {topic}",
+    "docs: describe {topic}",
+    "Update {topic}",
+]
+
+TOPICS = ["cache eviction", "kv transfer", "storage backend", "tokenizer", "config loader", "metrics", "scheduler"]
+
+
+def generate_repo(path: str, commits: int = 2000, authors: int = 20, files: int = 200, max_lines: int = 200,
+                  binary_ratio: float = 0.05, days: int = 365, seed: int = 0) -> Path:
+    """Create a git repository with a reproducible synthetic history.
+
+    Commits are spread evenly over the last `days` days and touch 1-5 of
+    `files` paths, rewriting each with up to `max_lines` lines; a
+    `binary_ratio` share of file changes are binary blobs. The history is
+    written with git fast-import, so large repositories build in seconds.
+    """
+    rng = random.Random(seed)
+    repo = Path(path)
+    if repo.exists() and any(repo.iterdir()):
+        # Only ever replace a repository this function generated
+        if not (repo / ".git" / "leaderboard-benchmark").exists():
+            raise ValueError(f"{repo} exists and is not a generated benchmark repository")
+        shutil.rmtree(repo)
+    repo.mkdir(parents=True, exist_ok=True)
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    (repo / ".git" / "leaderboard-benchmark").touch()
+
+    names = [f"Author {i:03d}" for i in range(authors)]
+    paths = [f"src/module_{i // 20}/file_{i}.py" for i in range(files)]
+    now = int(time.time())
+    # Keep an hour clear at both ends so every commit falls inside --days
+    start = now - days * 86400 + 3600
+    step = max(1, (days * 86400 - 7200) // max(1, commits))
+
+    chunks = []
+    for i in range(commits):
+        author = rng.choice(names)
+        email = author.lower().replace(" ", ".") + "@example.com"
+        timestamp = start + i * step
+        message = rng.choice(MESSAGE_TEMPLATES).format(topic=rng.choice(TOPICS)) + f" ({i})"
+        message_bytes = message.encode()
+        chunks.append(
+            f"commit refs/heads/main\nmark :{i + 1}\n"
+            f"author {author} <{email}> {timestamp} +0000\n"
+            f"committer {author} <{email}> {timestamp} +0000\n"
+            f"data {len(message_bytes)}\n".encode() + message_bytes + b"\n"
+        )
+        if i:
+            chunks.append(f"from :{i}\n".encode())
+        for file_path in rng.sample(paths, rng.randint(1, min(5, files))):
+            if rng.random() < binary_ratio:
+                file_path = file_path[:-3] + ".bin"
+                content = bytes(rng.getrandbits(8) for _ in range(rng.randint(64, 4096))) + b"\x00"
+            else:
+                lines = rng.randint(1, max_lines)
+                content = "".join(f"value_{rng.randint(0, 10 ** 6)} = {j}\n" for j in range(lines)).encode()
+            chunks.append(f"M 100644 inline {file_path}\ndata {len(content)}\n".encode() + content + b"\n")
+        chunks.append(b"\n")
+
+    subprocess.run(["git", "fast-import", "--quiet"], cwd=repo, input=b"".join(chunks), check=True)
+    subprocess.run(["git", "symbolic-ref", "HEAD", "refs/heads/main"], cwd=repo, check=True)
+    return repo
+
+
+class StubLLMServer:
+    """Local stand-in for the OpenAI and Anthropic APIs.
+
+    Serves /v1/chat/completions and /v1/messages with a fixed latency.
+    Responses come from StubBackend, so scores are reproducible and match
+    an in-process run with --provider stub. A share of
+    requests can be answered with one of error_statuses (429 by default;
+    e.g. 500 or Anthropic's 529 overloaded) to exercise the retry path.
+    """
+
+    ERROR_TYPES = {429: "rate_limit_error", 500: "api_error", 503: "api_error", 529: "overloaded_error"}
+
+    def __init__(self, latency: float = 0.05, error_rate: float = 0.0, port: int = 0, error_statuses: Tuple[int, ...] = (429,)):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.requests = 0
+        # Error responses sent, by status
+        self.errors = {status: 0 for status in error_statuses}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def rate_limited(self) -> int:
+        return self.errors.get(429, 0)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))))
+                with stub._lock:
+                    stub.requests += 1
+                    status = None
+                    if stub.error_rate > 0 and random.random() < stub.error_rate:
+                        status = random.choice(stub.error_statuses)
+                        stub.errors[status] += 1
+                time.sleep(stub.latency)
+
+                if status is not None:
+                    error_type = stub.ERROR_TYPES.get(status, "api_error")
+                    self.send_json(status, {"type": "error", "error": {"type": error_type, "message": f"stub {error_type}"}}, {"retry-after": "0"})
+                    return
+
+                text = StubBackend.completion_text(body["messages"][0]["content"])
+                if self.path.endswith("/messages"):
+                    self.send_json(200, {
+                        "id": "msg_stub", "type": "message", "role": "assistant", "model": body["model"],
+                        "content": [{"type": "text", "text": text}], "stop_reason": "end_turn",
+                        "usage": {"input_tokens": 0, "output_tokens": 0}
+                    })
+                else:
+                    self.send_json(200, {
+                        "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                    })
+
+            def send_json(self, status: int, payload: Dict, headers: Dict = None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StageTimer:
+    """Record wall-clock time per named stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def time(self, name: str, func, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.stages[name] = round(time.perf_counter() - started, 4)
+        print(f"   {name:<22} {self.stages[name]:>9.3f}s")
+        return result
+
+
+def make_analyzer(repo: Path, provider: str, stub: StubLLMServer, workdir: Path, **kwargs) -> CommitAnalyzer:
+    """Build an analyzer pointed at the stub endpoint for the given provider."""
+    for name in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "OPENAI_BASE_URL", "ANTHROPIC_BASE_URL"):
+        os.environ.pop(name, None)
+    openai_key = anthropic_key = None
+    if provider == "openai":
+        os.environ["OPENAI_BASE_URL"] = stub.base_url
+        openai_key = "stub"
+    elif provider == "anthropic":
+        # The Anthropic client adds /v1 itself
+        os.environ["ANTHROPIC_BASE_URL"] = stub.base_url[:-len("/v1")]
+        anthropic_key = "stub"
+    elif provider == "stub":
+        kwargs["scoring_backend"] = "stub"
+    analyzer = CommitAnalyzer(
+        str(repo), anthropic_key, openai_key,
+        manual_contributions_path=str(workdir / "manual-contributions.json"),
+        **kwargs
+    )
+    if provider == "stub":
+        analyzer.scoring_backend.latency = stub.latency
+    return analyzer
+
+
+def run_stages(analyzer: CommitAnalyzer, days: int, output_path: Path) -> Dict:
+    """Run the pipeline one stage at a time and return the stage timings."""
+    timer = StageTimer()
+    commits = timer.time("get_commits_since", analyzer.get_commits_since, days)
+
+    def read_stats():
+        commits_data = []
+        for commit in commits:
+            stats = analyzer.get_commit_stats(commit.hash)
+            commit.files_changed = stats["files_changed"]
+            commit.insertions = stats["insertions"]
+            commit.deletions = stats["deletions"]
+            commits_data.append({
+                "hash": commit.hash,
+                "message": commit.message,
+                "files_changed": commit.files_changed,
+                "insertions": commit.insertions,
+                "deletions": commit.deletions,
+                "total_lines": commit.total_lines,
+                "diff": stats["diff"]
+            })
+        return commits_data
+
+    commits_data = timer.time("get_commit_stats", read_stats)
+
+    def score_with_ai():
+        # Same concurrency and batching as iter_classified_commits
+        workers = analyzer.ai_concurrency if analyzer.ai_provider else 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            if analyzer.ai_provider and analyzer.ai_batch_size > 1:
+                size = analyzer.ai_batch_size
+                batches = [commits_data[i:i + size] for i in range(0, len(commits_data), size)]
+                return [result for results in executor.map(analyzer.calculate_ai_scores_batch, batches) for result in results]
+            return list(executor.map(analyzer._calculate_ai_score, commits_data))
+
+    ai_results = timer.time("calculate_ai_score", score_with_ai)
+    classified = timer.time(
+        "classify", lambda: [analyzer._classify_commit(c, None, r)[0] for c, r in zip(commits, ai_results)]
+    )
+    aggregated = timer.time("aggregate_by_period", analyzer.aggregate_by_period, classified)
+    leaderboards = timer.time("generate_leaderboard", analyzer.generate_leaderboard, aggregated)
+
+    def write_json():
+        output = {
+            "last_updated": datetime.now().isoformat(),
+            "total_commits_analyzed": len(classified),
+            "analysis_period_days": days,
+            "leaderboards": leaderboards
+        }
+        with open(output_path, "w") as f:
+            f.write(json.dumps(output, indent=2))
+
+    timer.time("json_write", write_json)
+    if analyzer.git_reader is not None:
+        analyzer.git_reader.close()
+    return {"commits": len(commits), "stages": timer.stages, "classified": classified}
+
+
+def check_vectorized_parity(repo: Path, workdir: Path, classified: List) -> bool:
+    """Compare the NumPy engine against the scalar scorers and bucketing.
+
+    Returns True when both paths give identical heuristic scores and
+    leaderboards, or when NumPy is not installed.
+    """
+    if not analyze_commits.NUMPY_AVAILABLE:
+        print("   NumPy not installed, skipping")
+        return True
+
+    vectorized = make_analyzer(repo, "none", None, workdir, persistent_git=False)
+    scalar = make_analyzer(repo, "none", None, workdir, persistent_git=False, vectorized=False)
+    engine = vectorized.batch_engine()
+    if engine is None:
+        print("   Vectorized engine disabled (scorers were modified), skipping")
+        return True
+
+    loc, files, keyword = engine.heuristic_scores(
+        [c.total_lines for c in classified], [c.files_changed for c in classified], [c.message for c in classified]
+    )
+    mismatches = sum(
+        1 for c, scores in zip(classified, zip(loc.tolist(), files.tolist(), keyword.tolist()))
+        if scores != (scalar.calculate_loc_score(c.total_lines), scalar.calculate_files_score(c.files_changed),
+                      scalar.calculate_keyword_score(c.message))
+    )
+
+    aggregated, totals = engine.aggregate(classified)
+    expected = scalar.generate_leaderboard(scalar.aggregate_by_period(classified))
+    same_leaderboards = vectorized.generate_leaderboard(aggregated, totals) == expected
+    print(f"   heuristic score mismatches: {mismatches}, leaderboards identical: {same_leaderboards}")
+    return mismatches == 0 and same_leaderboards
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_result(results_path: Path, config: Dict) -> Dict:
+    """Return the most recent recorded result with the same configuration."""
+    if not results_path.exists():
+        return None
+    previous = None
+    with open(results_path) as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                if result.get("config") == config:
+                    previous = result
+    return previous
+
+
+def report_regressions(result: Dict, previous: Dict, threshold: float) -> List[str]:
+    """Print the change against the previous run and return stages slower by more than threshold."""
+    regressions = []
+    print(f"\n📈 Compared with {previous['revision']} ({previous['timestamp']}):")
+    for name, seconds in result["stages"].items():
+        before = previous["stages"].get(name)
+        if not before:
+            continue
+        change = (seconds - before) / before
+        flag = ""
+        # Ignore noise on stages that take a few milliseconds
+        if change > threshold and seconds - before > 0.01:
+            regressions.append(name)
+            flag = "  ⚠️  regression"
+        print(f"   {name:<22} {before:>9.3f}s -> {seconds:>9.3f}s ({change:+.0%}){flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmark the leaderboard analyzer on a synthetic repository")
+    parser.add_argument("--commits", type=int, default=2000, help="Commits in the synthetic repository")
+    parser.add_argument("--authors", type=int, default=20, help="Distinct commit authors")
+    parser.add_argument("--files", type=int, default=200, help="Files the commits are spread over")
+    parser.add_argument("--max-lines", type=int, default=200, help="Maximum lines written per changed file")
+    parser.add_argument("--binary-ratio", type=float, default=0.05, help="Share of file changes that are binary")
+    parser.add_argument("--days", type=int, default=365, help="Days of history generated and analyzed")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic history")
+    parser.add_argument("--repo", help="Keep the synthetic repository here (rebuilt on each run)")
+    parser.add_argument("--provider", choices=["openai", "anthropic", "stub", "none"], default="openai", help="AI provider the stub imitates (stub scores in-process without HTTP, none uses the heuristic fallback)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub LLM response latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of stub requests answered with 429")
+    parser.add_argument("--ai-concurrency", type=int, default=4, help="Maximum number of AI scoring requests in flight")
+    parser.add_argument("--ai-rate-limit", type=float, default=0, help="Maximum AI requests per second (0 disables the limit)")
+    parser.add_argument("--ai-batch-size", type=int, default=1, help="Commits scored per AI request")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to extract history in the end-to-end run")
+    parser.add_argument("--skip-analyze", action="store_true", help="Only time the individual stages, not the end-to-end analyze()")
+    parser.add_argument("--results", default="benchmark-results.jsonl", help="File the results are appended to")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown against the previous run reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if a stage regressed")
+
+    args = parser.parse_args()
+
+    config = {
+        "commits": args.commits, "authors": args.authors, "files": args.files, "max_lines": args.max_lines,
+        "binary_ratio": args.binary_ratio, "days": args.days, "seed": args.seed, "provider": args.provider,
+        "latency": args.latency, "error_rate": args.error_rate, "ai_concurrency": args.ai_concurrency,
+        "ai_rate_limit": args.ai_rate_limit, "ai_batch_size": args.ai_batch_size, "workers": args.workers
+    }
+
+    workdir = Path(tempfile.mkdtemp(prefix="leaderboard-bench-"))
+    stub = StubLLMServer(latency=args.latency, error_rate=args.error_rate)
+    stub.start()
+    try:
+        print(f"🏗️  Generating repository with {args.commits} commits...")
+        started = time.perf_counter()
+        repo = generate_repo(
+            args.repo or str(workdir / "repo"), args.commits, args.authors, args.files,
+            args.max_lines, args.binary_ratio, args.days, args.seed
+        )
+        print(f"   Built in {time.perf_counter() - started:.2f}s at {repo}")
+
+        analyzer_options = {
+            "ai_concurrency": args.ai_concurrency,
+            "ai_rate_limit": args.ai_rate_limit,
+            "ai_batch_size": args.ai_batch_size
+        }
+
+        print("\n⏱️  Timing stages...")
+        analyzer = make_analyzer(repo, args.provider, stub, workdir, **analyzer_options)
+        run = run_stages(analyzer, args.days, workdir / "stages.json")
+        stages = run["stages"]
+
+        if not args.skip_analyze:
+            print("\n⏱️  Timing end-to-end analyze()...")
+            analyzer = make_analyzer(repo, args.provider, stub, workdir, extract_workers=args.workers, **analyzer_options)
+            timer = StageTimer()
+            with open(os.devnull, "w") as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    timer.time("analyze", analyzer.analyze, str(workdir / "analyze.json"), args.days)
+                finally:
+                    sys.stdout = stdout
+            print(f"   {'analyze':<22} {timer.stages['analyze']:>9.3f}s")
+            stages.update(timer.stages)
+
+        print("\n🔬 Checking vectorized scoring against the scalar path...")
+        parity = check_vectorized_parity(repo, workdir, run["classified"])
+    finally:
+        stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": analyze_commits.NUMPY_AVAILABLE,
+        "config": config,
+        "commits": run["commits"],
+        "stub_requests": stub.requests,
+        "stub_rate_limited": stub.rate_limited,
+        "vectorized_parity": parity,
+        "stages": stages
+    }
+
+    results_path = Path(args.results)
+    previous = previous_result(results_path, config)
+    regressions = report_regressions(result, previous, args.threshold) if previous else []
+    with open(results_path, "a") as f:
+        f.write(json.dumps(result) + "\n")
+    print(f"\n✅ Results appended to {results_path}")
+
+    if not parity:
+        print("❌ Vectorized scoring differs from the scalar path")
+        sys.exit(1)
+    if regressions and args.fail_on_regression:
+        print(f"❌ Regressed stages: {', '.join(regressions)}")
+        sys.exit(1)
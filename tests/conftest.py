@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class GitRepo:
+    """Throwaway repository with commits at chosen times."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.git("init", "-q", "-b", "main")
+
+    def git(self, *args: str, env: dict = None) -> str:
+        return subprocess.run(
+            ["git", "-c", "user.name=Committer", "-c", "user.email=committer@example.com", *args],
+            cwd=self.path, env=dict(os.environ, **(env or {})),
+            capture_output=True, check=True
+        ).stdout.decode("utf-8", "replace").strip()
+
+    def commit(self, files: dict, message: str, author: str = "Alice", email: str = "alice@example.com",
+               when: datetime = None) -> str:
+        """Write files (str or bytes paths to bytes contents), commit them and return the hash."""
+        for name, content in files.items():
+            path = os.path.join(os.fsencode(self.path), os.fsencode(name))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(content)
+        stamp = (when or datetime.now() - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S")
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", message, env={
+            "GIT_AUTHOR_NAME": author, "GIT_AUTHOR_EMAIL": email,
+            "GIT_AUTHOR_DATE": stamp, "GIT_COMMITTER_DATE": stamp
+        })
+        return self.git("rev-parse", "HEAD")
+
+
+@pytest.fixture(autouse=True)
+def no_provider_keys(monkeypatch):
+    """Keep tests offline: without keys the analyzer uses the heuristic backend."""
+    for name in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "OPENAI_BASE_URL", "ANTHROPIC_BASE_URL"):
+        monkeypatch.delenv(name, raising=False)
+
+
+@pytest.fixture
+def git_repo(tmp_path) -> GitRepo:
+    path = tmp_path / "repo"
+    path.mkdir()
+    return GitRepo(path)
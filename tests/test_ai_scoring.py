@@ -0,0 +1,172 @@
+import json
+import random
+
+import pytest
+
+from analyze_commits import CommitAnalyzer
+from benchmark import StubLLMServer
+
+pytest.importorskip("openai")
+
+
+class JitteryStubServer(StubLLMServer):
+    """Stub whose responses take a random time, so they complete out of order."""
+
+    latency = property(lambda self: random.uniform(0, 0.03), lambda self, value: None)
+
+
+def make_history(git_repo, count: int = 24):
+    for i in range(count):
+        lines = b"".join(b"line %d of change %d\n" % (j, i) for j in range(1 + 7 * i))
+        git_repo.commit({f"src/module_{i % 5}.py": lines}, f"feat: change number {i}")
+
+
+def ai_scores(analyzer: CommitAnalyzer, with_stats: bool = False):
+    # Commits read with their stats only fetch a diff when AI scoring needs it
+    commits = analyzer.iter_commits_with_stats(days=30) if with_stats else analyzer.get_commits_since(days=30)
+    return [(commit.hash, commit.ai_score) for commit, _ in analyzer.iter_classified_commits(commits)]
+
+
+@pytest.mark.parametrize("batch_size", [1, 3])
+def test_concurrent_scoring_against_stub_server(git_repo, tmp_path, monkeypatch, batch_size):
+    make_history(git_repo)
+    manual = str(tmp_path / "none.json")
+    expected = ai_scores(CommitAnalyzer(
+        str(git_repo.path), manual_contributions_path=manual, scoring_backend="stub", ai_batch_size=batch_size
+    ))
+
+    random.seed(3)
+    server = JitteryStubServer(error_rate=0.3)
+    server.start()
+    try:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        analyzer = CommitAnalyzer(
+            str(git_repo.path), openai_api_key="stub", manual_contributions_path=manual,
+            ai_concurrency=4, ai_rate_limit=0, ai_batch_size=batch_size, ai_max_retries=20
+        )
+        assert analyzer.ai_provider == "openai"
+        scores = ai_scores(analyzer)
+    finally:
+        server.stop()
+
+    # Same commits in the same order, and every score came from the stub rather than the fallback
+    assert scores == expected
+    counters = analyzer.metrics.to_dict()["counters"]
+    assert counters["ai_rate_limited"] > 0
+    assert counters["ai_rate_limited"] == server.rate_limited
+    assert counters["ai_fallbacks"] == 0
+
+
+@pytest.mark.parametrize("batch_size", [1, 3])
+def test_open_breaker_skips_diff_fetches(git_repo, tmp_path, batch_size):
+    make_history(git_repo, count=9)
+    # The budget is spent by the first request, which trips the breaker
+    analyzer = CommitAnalyzer(
+        str(git_repo.path), manual_contributions_path=str(tmp_path / "none.json"), scoring_backend="stub",
+        ai_concurrency=1, ai_batch_size=batch_size, ai_budget=1e-9, write_metrics=False
+    )
+    fetched = []
+    get_commit_diff = analyzer.get_commit_diff
+    analyzer.get_commit_diff = lambda commit_hash, exclude_paths=(): fetched.append(commit_hash) or get_commit_diff(commit_hash, exclude_paths)
+
+    analyzer.analyze(str(tmp_path / "out.json"))
+
+    assert analyzer.ai_breaker.open
+    assert len(fetched) == batch_size
+    assert len(analyzer.fallback_commits) == 9
+
+
+@pytest.mark.parametrize("batch_size", [1, 3])
+def test_open_breaker_still_serves_cached_scores(git_repo, tmp_path, batch_size):
+    make_history(git_repo, count=9)
+    options = dict(
+        manual_contributions_path=str(tmp_path / "none.json"), scoring_backend="stub", ai_concurrency=1,
+        ai_batch_size=batch_size, ai_cache_path=str(tmp_path / "ai-cache.db"), write_metrics=False
+    )
+    expected = dict(ai_scores(CommitAnalyzer(str(git_repo.path), **options), with_stats=True))
+    new_hash = git_repo.commit({"src/new.py": b"print(1)\n" * 30}, "feat: newest")
+
+    # The newest commit is not cached; its request spends the budget and trips the breaker
+    analyzer = CommitAnalyzer(str(git_repo.path), ai_budget=1e-9, **options)
+    scores = dict(ai_scores(analyzer, with_stats=True))
+
+    assert analyzer.ai_breaker.open
+    assert analyzer.fallback_commits == {new_hash}
+    assert {commit_hash: scores[commit_hash] for commit_hash in expected} == expected
+    assert analyzer.last_ai_cache_stats == (9, 1)
+
+
+@pytest.mark.parametrize("provider, status", [("openai", 500), ("anthropic", 529)])
+def test_transient_server_errors_are_retried(git_repo, tmp_path, monkeypatch, provider, status):
+    if provider == "anthropic":
+        pytest.importorskip("anthropic")
+    make_history(git_repo, count=10)
+    manual = str(tmp_path / "none.json")
+    expected = ai_scores(CommitAnalyzer(str(git_repo.path), manual_contributions_path=manual, scoring_backend="stub"))
+
+    random.seed(5)
+    server = StubLLMServer(latency=0, error_rate=0.4, error_statuses=(status, 429))
+    server.start()
+    try:
+        monkeypatch.setenv(f"{provider.upper()}_BASE_URL", server.base_url.removesuffix("/v1") if provider == "anthropic" else server.base_url)
+        analyzer = CommitAnalyzer(
+            str(git_repo.path), manual_contributions_path=manual, ai_concurrency=2, ai_rate_limit=0, ai_max_retries=20,
+            **{f"{provider}_api_key": "stub"}
+        )
+        assert analyzer.ai_provider == provider
+        scores = ai_scores(analyzer)
+    finally:
+        server.stop()
+
+    # Server errors were retried like 429s, so no commit fell back and the breaker stayed closed
+    assert scores == expected
+    counters = analyzer.metrics.to_dict()["counters"]
+    assert counters["ai_retried"] == server.errors[status] > 0
+    assert counters["ai_rate_limited"] == server.rate_limited
+    assert counters["ai_fallbacks"] == 0 and not analyzer.ai_breaker.open
+
+
+def batch_commits(count: int):
+    return [
+        {"hash": f"{i:02d}" * 20, "message": f"feat: change {i}", "files_changed": 1,
+         "insertions": 40 * i, "deletions": 3, "total_lines": 40 * i + 3, "diff": f"+line {i}\n"}
+        for i in range(count)
+    ]
+
+
+def score_batch_with_response(tmp_path, commits, response):
+    analyzer = CommitAnalyzer(str(tmp_path), manual_contributions_path=str(tmp_path / "none.json"), scoring_backend="stub")
+    prompts = []
+    analyzer.scoring_backend.complete = lambda prompt, max_tokens, timeout=None: prompts.append(prompt) or response
+    return analyzer, analyzer.calculate_ai_scores_batch(commits), prompts
+
+
+def test_batch_response_entries_are_checked_one_by_one(tmp_path):
+    commits = batch_commits(7)
+    ids = [c["hash"][:12] for c in commits]
+    entries = {ids[0]: 20, ids[2]: "abc", ids[3]: True, ids[4]: "7", ids[5]: None, ids[6]: 31}
+    # ids[1] is missing; prose and a code fence surround the object
+    response = "Here are the scores:\n```json\n" + json.dumps(entries) + "\n```\nLet me know if you need more."
+
+    analyzer, results, prompts = score_batch_with_response(tmp_path, commits, response)
+
+    version = analyzer.scoring_fingerprints()["ai"]
+    fallback = [(c["total_lines"] // 10, "fallback") for c in commits]
+    assert len(prompts) == 1 and all(commit_id in prompts[0] for commit_id in ids)
+    assert results == [(20, version), fallback[1], fallback[2], fallback[3], (7, version), fallback[5], (25, version)]
+    assert analyzer.metrics.to_dict()["counters"]["ai_fallbacks"] == 4
+
+
+@pytest.mark.parametrize("response", [
+    "[12, 14, 3]",
+    "I cannot rate these commits.",
+    '{"scores": [1, 2, 3]',
+    '"12"'
+])
+def test_batch_response_that_is_not_an_object_falls_back(tmp_path, response):
+    commits = batch_commits(3)
+
+    analyzer, results, _ = score_batch_with_response(tmp_path, commits, response)
+
+    assert results == [(c["total_lines"] // 10, "fallback") for c in commits]
+    assert analyzer.metrics.to_dict()["counters"]["ai_fallbacks"] == 3
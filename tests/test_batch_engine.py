@@ -0,0 +1,95 @@
+import time
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from analyze_commits import CommitAnalyzer, CommitRecord, BatchScoringEngine
+
+# Local times around DST switches (America/New_York) and ISO week/year boundaries
+LOCAL_TIMES = [
+    datetime(2025, 3, 9, 1, 59), datetime(2025, 3, 9, 3, 0),
+    datetime(2025, 11, 2, 0, 30), datetime(2025, 11, 2, 1, 30), datetime(2025, 11, 2, 23, 59),
+    datetime(2024, 12, 29, 23, 59), datetime(2024, 12, 30, 0, 0), datetime(2024, 12, 31, 23, 59),
+    datetime(2025, 12, 28, 23, 59), datetime(2025, 12, 29, 0, 1), datetime(2026, 1, 1, 0, 0),
+    datetime(2020, 12, 31, 23, 59), datetime(2021, 1, 1, 0, 0), datetime(2021, 1, 3, 23, 59),
+    datetime(2021, 1, 4, 0, 0), datetime(2025, 3, 31, 23, 59), datetime(2025, 4, 1, 0, 0)
+]
+
+MESSAGES = [
+    "feat: add export", "Fix: crash on start", "docs: typo", "chore: bump deps", "Update readme",
+    "refactor: split parser", "ci: cache wheels", "improve: faster load", "merge branch", ""
+]
+
+LINE_COUNTS = [0, 1, 19, 20, 49, 50, 99, 100, 5000]
+FILE_COUNTS = [0, 1, 2, 4, 5, 60]
+
+
+@pytest.fixture
+def new_york(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def make_commits():
+    commits = []
+    for i, when in enumerate(LOCAL_TIMES * 3):
+        lines = LINE_COUNTS[i % len(LINE_COUNTS)]
+        commit = CommitRecord(
+            f"{i:040x}", ["Alice", "Bob", "Carol"][i % 3], f"dev{i % 3}@example.com", int(when.timestamp()),
+            MESSAGES[i % len(MESSAGES)], files_changed=FILE_COUNTS[i % len(FILE_COUNTS)],
+            insertions=lines // 2, deletions=lines - lines // 2
+        )
+        commits.append(commit)
+    return commits
+
+
+def classify(analyzer, commits):
+    for commit in commits:
+        commit.loc_score = analyzer.calculate_loc_score(commit.insertions + commit.deletions)
+        commit.files_score = analyzer.calculate_files_score(commit.files_changed)
+        commit.keyword_score = analyzer.calculate_keyword_score(commit.message)
+        commit.ai_score = 10
+        commit.classification = "significant" if commit.total_score >= 50 else "routine"
+    return commits
+
+
+def grouped(aggregated):
+    return {
+        period_type: {
+            period: {author: [c.hash for c in commits] for author, commits in authors.items()}
+            for period, authors in periods.items()
+        }
+        for period_type, periods in aggregated.items()
+    }
+
+
+def test_heuristic_scores_match_scalar_scorers(tmp_path):
+    analyzer = CommitAnalyzer(str(tmp_path))
+    lines = [n for n in LINE_COUNTS for _ in FILE_COUNTS]
+    files = FILE_COUNTS * len(LINE_COUNTS)
+    messages = (MESSAGES * len(lines))[:len(lines)]
+
+    loc_scores, files_scores, keyword_scores = BatchScoringEngine().heuristic_scores(lines, files, messages)
+
+    assert list(loc_scores) == [analyzer.calculate_loc_score(n) for n in lines]
+    assert list(files_scores) == [analyzer.calculate_files_score(n) for n in files]
+    assert list(keyword_scores) == [analyzer.calculate_keyword_score(m) for m in messages]
+
+
+def test_aggregate_matches_scalar_path(tmp_path, new_york):
+    scalar = CommitAnalyzer(str(tmp_path), vectorized=False)
+    vectorized = CommitAnalyzer(str(tmp_path))
+    commits = classify(scalar, make_commits())
+
+    expected = scalar.aggregate_by_period(commits)
+    aggregated, totals = vectorized.batch_engine().aggregate(commits)
+
+    assert grouped(aggregated) == grouped(expected)
+    # The ISO week of the first days of 2021 belongs to 2020 but keeps its calendar year
+    assert "2021-W53" in aggregated["weekly"]
+    assert vectorized.generate_leaderboard(aggregated, totals) == scalar.generate_leaderboard(expected)
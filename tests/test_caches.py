@@ -0,0 +1,86 @@
+import sqlite3
+
+import pytest
+
+import analyze_commits
+from analyze_commits import AIScoreCache, ClassificationCache, CommitAnalyzer
+
+
+def stored_keys(path) -> set:
+    conn = sqlite3.connect(str(path))
+    try:
+        return {row[0] for row in conn.execute("SELECT key FROM ai_scores")}
+    finally:
+        conn.close()
+
+
+def test_ai_score_cache_commits_and_evicts_while_open(tmp_path):
+    path = tmp_path / "ai.db"
+    cache = AIScoreCache(str(path), max_entries=60)
+    for i in range(AIScoreCache.COMMIT_EVERY):
+        cache.put(f"key-{i}", i)
+    # Visible to another connection without close(), so a killed run keeps them
+    assert len(stored_keys(path)) == AIScoreCache.COMMIT_EVERY
+
+    assert cache.get("key-0") == 0
+    for i in range(AIScoreCache.COMMIT_EVERY, 2 * AIScoreCache.COMMIT_EVERY):
+        cache.put(f"key-{i}", i)
+    keys = stored_keys(path)
+    assert len(keys) == 60
+    # key-0 was used recently, key-1 is the least recently used
+    assert "key-0" in keys and "key-1" not in keys
+
+    cache.put("key-0", 7)
+    cache.close()
+    reopened = AIScoreCache(str(path), max_entries=60)
+    assert reopened.get("key-0") == 7
+    assert reopened.entries == 60
+    reopened.close()
+
+
+def cached_rows(path) -> dict:
+    cache = ClassificationCache(str(path))
+    try:
+        return {row[0]: row[1:] for row in cache.conn.execute("SELECT * FROM commit_scores")}
+    finally:
+        cache.close()
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_changed_scorer_only_invalidates_its_own_field(git_repo, tmp_path, monkeypatch, vectorized):
+    for i in range(6):
+        git_repo.commit({f"src/{i}.py": b"x\n" * (15 * i + 1)}, f"feat: change {i}")
+    cache_path = tmp_path / "scores.db"
+
+    def run():
+        analyzer = CommitAnalyzer(
+            str(git_repo.path), manual_contributions_path=str(tmp_path / "none.json"), cache_path=str(cache_path),
+            scoring_backend="stub", vectorized=vectorized, write_metrics=False
+        )
+        # Fingerprint the real scorers before counting their calls
+        analyzer.scoring_fingerprints()
+        calls = {name: 0 for name in ("calculate_loc_score", "calculate_files_score", "calculate_keyword_score")}
+        for name in calls:
+            scorer = getattr(analyzer, name)
+            setattr(analyzer, name, lambda value, name=name, scorer=scorer: calls.__setitem__(name, calls[name] + 1) or scorer(value))
+        analyzer.analyze(str(tmp_path / "out.json"))
+        return analyzer, calls
+
+    first, _ = run()
+    assert first.metrics.to_dict()["counters"]["ai_requests"] == 6
+    before = cached_rows(cache_path)
+
+    monkeypatch.setattr(analyze_commits, "LOC_SCORE_TIERS", ((10, 40), (1, 2)))
+    second, calls = run()
+
+    # The AI scores are reused without a request, and only the loc field is rewritten
+    assert second.metrics.to_dict()["counters"]["ai_requests"] == 0
+    after = cached_rows(cache_path)
+    assert after.keys() == before.keys()
+    for commit_hash, (loc, loc_version, *rest) in after.items():
+        assert loc_version != before[commit_hash][1]
+        assert rest == list(before[commit_hash][2:])
+    # 1, 16, 31, ... changed lines under the new tiers
+    assert sorted(loc for loc, *_ in after.values()) == [2, 40, 40, 40, 40, 40]
+    if not vectorized:
+        assert calls == {"calculate_loc_score": 6, "calculate_files_score": 0, "calculate_keyword_score": 0}
@@ -0,0 +1,42 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from analyze_commits import CommitAnalyzer, DateRangeIndex
+
+AUTHORS = ["Alice", "Bob", "Carol"]
+
+
+@pytest.fixture
+def analyzed(git_repo, tmp_path):
+    now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    for i in range(30):
+        author = AUTHORS[i * 7 % 3]
+        # Several commits a day, some days apart, spread over four months
+        when = now - timedelta(days=120 - 4 * (i // 2), hours=i % 2)
+        git_repo.commit({f"src/{i % 4}.py": b"x\n" * (i * 9 % 130 + 1)}, ["feat: add", "fix: bug", "docs: note"][i % 3],
+                        author=author, email=f"{author.lower()}@example.com", when=when)
+    analyzer = CommitAnalyzer(
+        str(git_repo.path), manual_contributions_path=str(tmp_path / "none.json"), write_metrics=False
+    )
+    output, classified_commits, _ = analyzer._analyze(tmp_path / "out.json", 365, None)
+    return analyzer, output, classified_commits
+
+
+@pytest.mark.parametrize("source", ["commits", "output"])
+def test_date_range_matches_period_leaderboards(analyzed, tmp_path, source):
+    analyzer, output, classified_commits = analyzed
+    if source == "commits":
+        index = DateRangeIndex.from_commits(classified_commits)
+    else:
+        index = DateRangeIndex.from_output(json.loads((tmp_path / "out.json").read_text()))
+
+    checked = 0
+    for period_type in ("monthly", "quarterly"):
+        for period, contributors in output["leaderboards"][period_type].items():
+            start, end = analyzer.parse_period_bounds(period, period_type)
+            expected = [{key: value for key, value in c.items() if key != "commits"} for c in contributors]
+            assert analyzer.rank_date_range(index, start.date(), end.date()) == expected, period
+            checked += 1
+    assert checked >= 4
@@ -0,0 +1,123 @@
+import json
+import threading
+
+import pytest
+
+from analyze_commits import MIN_COMMITS_PER_WORKER, CommitAnalyzer, GitBatchReader, stream_numstat_log
+from benchmark import generate_repo
+
+LATIN1_NAME = "caf\xe9.txt".encode("latin-1")
+LATIN1_BINARY = "logo-\xe9.bin".encode("latin-1")
+
+
+def make_history(git_repo):
+    git_repo.commit({"README.md": b"hello\n"}, "docs: add readme")
+    git_repo.commit({LATIN1_NAME: b"one\ntwo\n"}, "feat: add latin-1 file")
+    git_repo.commit({LATIN1_NAME: b"one\n", LATIN1_BINARY: bytes(range(256))}, "fix: trim and add binary")
+    git_repo.commit({"src/app.py": "print('caf\xe9')\n".encode("latin-1")}, "chore: latin-1 content")
+
+
+def test_numstat_stream_handles_non_utf8_paths(git_repo):
+    make_history(git_repo)
+    commits = list(stream_numstat_log(git_repo.path, []))
+
+    assert [c.message for c in commits] == [
+        "chore: latin-1 content", "fix: trim and add binary", "feat: add latin-1 file", "docs: add readme"
+    ]
+    fix = commits[1]
+    assert (fix.files_changed, fix.insertions, fix.deletions) == (2, 0, 1)
+    assert [path.encode("utf-8", "surrogateescape") for path in fix.binary_files] == [LATIN1_BINARY]
+    added = commits[2]
+    assert (added.files_changed, added.insertions) == (1, 2)
+
+
+def test_batch_reader_handles_non_utf8_paths(git_repo):
+    make_history(git_repo)
+    hashes = git_repo.git("rev-list", "HEAD").split()
+    reader = GitBatchReader(git_repo.path)
+    try:
+        stats = reader.read_stats(hashes[2])
+        assert (stats["files_changed"], stats["insertions"]) == (1, 2)
+        assert stats["files_list"][0].encode("utf-8", "surrogateescape") == LATIN1_NAME
+        diff, truncated = reader.read_diff(hashes[0], 4000)
+        assert "src/app.py" in diff and not truncated
+    finally:
+        reader.close()
+
+
+def test_analyze_with_non_utf8_paths(git_repo, tmp_path):
+    make_history(git_repo)
+    output = tmp_path / "out.json"
+    for persistent_git in (True, False):
+        analyzer = CommitAnalyzer(
+            str(git_repo.path), manual_contributions_path=str(tmp_path / "none.json"),
+            persistent_git=persistent_git, skip_binary_diffs=True,
+            checkpoint_path=str(tmp_path / "out.checkpoint.ndjson"), write_metrics=False
+        )
+        analyzer.analyze(str(output))
+        assert json.loads(output.read_text())["total_commits_analyzed"] == 4
+
+
+def test_batch_reader_stops_reading_past_the_limit(git_repo):
+    git_repo.commit({"small.txt": b"a\n"}, "docs: small")
+    git_repo.commit({"package-lock.json": b"".join(b'  "pkg-%d": "1.0.%d",\n' % (i, i) for i in range(100000))}, "chore: lock")
+    git_repo.commit({"small.txt": b"b\n"}, "fix: small again")
+    last, lock, first = git_repo.git("rev-list", "HEAD").split()
+    reader = GitBatchReader(git_repo.path)
+    try:
+        diff, truncated = reader.read_diff(lock, 4000)
+        assert truncated and len(diff) == 4000
+        # The rest of the patch is not drained: the process is dropped and restarted
+        assert "diff" not in reader.processes
+        for commit_hash, text in ((last, "+b"), (first, "+a"), (last, "+b")):
+            diff, truncated = reader.read_diff(commit_hash, 4000)
+            assert text in diff and not truncated
+        assert reader.processes["diff"].poll() is None
+    finally:
+        reader.close()
+
+
+@pytest.mark.parametrize("short_name", ["a.txt", "abcdefghijk", "abcdefghijklmnopqrst"])
+def test_batch_reader_finds_the_stats_sentinel_across_reads(git_repo, short_name):
+    # 624 entries of "1\t0\t<100 chars>\0" are 65520 characters, so the short entry puts the end
+    # of the output just before, exactly at or just after the 65536-character read boundary
+    files = {f"{i:04d}".ljust(100, "x"): b"x\n" for i in range(624)}
+    files[short_name] = b"x\n"
+    commit_hash = git_repo.commit(files, "feat: many files")
+    reader = GitBatchReader(git_repo.path)
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(reader.read_stats(commit_hash)), daemon=True)
+    thread.start()
+    thread.join(timeout=20)
+    if thread.is_alive():
+        # The stuck query holds the reader's lock; leave it to the daemon thread
+        for process in list(reader.processes.values()):
+            process.kill()
+        pytest.fail("read_stats did not find the end of the output")
+    try:
+        assert (result["files_changed"], result["insertions"]) == (625, 625)
+        assert short_name in result["files_list"]
+        # The process is still in sync for the next query
+        assert reader.read_stats(commit_hash)["files_changed"] == 625
+    finally:
+        reader.close()
+
+
+def test_parallel_extraction_matches_serial_output(tmp_path):
+    repo = generate_repo(str(tmp_path / "repo"), commits=2 * MIN_COMMITS_PER_WORKER + 150, authors=12, files=60, seed=3)
+    outputs = {}
+    subprocesses = {}
+    for workers in (1, 4):
+        output = tmp_path / f"out-{workers}.json"
+        analyzer = CommitAnalyzer(
+            str(repo), manual_contributions_path=str(tmp_path / "none.json"), extract_workers=workers, write_metrics=False
+        )
+        analyzer.analyze(str(output))
+        # Everything but the run timestamp
+        outputs[workers] = [line for line in output.read_bytes().splitlines() if b'"last_updated"' not in line]
+        subprocesses[workers] = analyzer.metrics.to_dict()["counters"]["git_subprocesses"]
+
+    # One rev-list and three ranges extracted in parallel, instead of one git log
+    assert (subprocesses[1], subprocesses[4]) == (1, 4)
+    assert outputs[4] == outputs[1]
+    assert json.loads(output.read_text())["total_commits_analyzed"] == 2 * MIN_COMMITS_PER_WORKER + 150
@@ -0,0 +1,23 @@
+import pytest
+
+from analyze_commits import RunMetrics
+
+
+@pytest.mark.parametrize("count, expected", [
+    (1, {"p50": 1, "p90": 1, "p99": 1}),
+    (2, {"p50": 1, "p90": 2, "p99": 2}),
+    (10, {"p50": 5, "p90": 9, "p99": 10}),
+    (100, {"p50": 50, "p90": 90, "p99": 99})
+])
+def test_latency_percentiles_are_nearest_rank(count, expected):
+    metrics = RunMetrics()
+    for seconds in range(count, 0, -1):
+        metrics.observe_ai_latency(seconds)
+
+    latency = metrics.to_dict()["ai_latency_seconds"]
+    assert {name: latency[name] for name in expected} == expected
+
+
+def test_latency_percentiles_without_requests():
+    latency = RunMetrics().to_dict()["ai_latency_seconds"]
+    assert (latency["p50"], latency["p90"], latency["p99"]) == (None, None, None)
@@ -0,0 +1,28 @@
+import json
+from datetime import datetime, timedelta
+
+from analyze_commits import CommitAnalyzer, load_sharded_output
+
+
+def test_sharded_output_round_trips(git_repo, tmp_path):
+    now = datetime.now()
+    for i, (author, days_ago) in enumerate([("Alice", 70), ("Bob", 40), ("Alice", 3), ("Bob", 1)]):
+        git_repo.commit({f"file_{i}.txt": b"x\n" * (10 * i + 1)}, f"feat: change {i}", author=author,
+                        email=f"{author.lower()}@example.com", when=now - timedelta(days=days_ago))
+    output = tmp_path / "out.json"
+    shard_dir = tmp_path / "shards"
+    analyzer = CommitAnalyzer(
+        str(git_repo.path), manual_contributions_path=str(tmp_path / "none.json"),
+        shard_dir=str(shard_dir), write_metrics=False
+    )
+
+    analyzer.analyze(str(output))
+    assert load_sharded_output(str(shard_dir)) == json.loads(output.read_text())
+
+    # Shards of periods without new commits are kept; the reassembled output still matches
+    before = {path: path.stat().st_mtime_ns for path in shard_dir.rglob("*.json")}
+    git_repo.commit({"late.txt": b"y\n"}, "fix: late change")
+    analyzer.analyze(str(output))
+    assert load_sharded_output(str(shard_dir)) == json.loads(output.read_text())
+    unchanged = [path for path, mtime in before.items() if path.stat().st_mtime_ns == mtime]
+    assert any(path.parent.name == "commits" for path in unchanged)
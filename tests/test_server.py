@@ -0,0 +1,59 @@
+import gzip
+import http.client
+import json
+
+import pytest
+
+from analyze_commits import LeaderboardServer
+
+OUTPUT = {
+    "last_updated": "2025-06-01T12:00:00",
+    "leaderboards": {"monthly": {"2025-06": [{"name": "Alice", "total_score": 120}]}}
+}
+
+
+@pytest.fixture
+def server():
+    server = LeaderboardServer(port=0)
+    server.publish(OUTPUT)
+    server.start()
+    yield server
+    server.stop()
+
+
+def request(server, path, headers=None):
+    connection = http.client.HTTPConnection(*server.address, timeout=5)
+    try:
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.getheader("ETag"), response.read()
+    finally:
+        connection.close()
+
+
+def test_each_encoding_has_its_own_etag(server):
+    status, identity_tag, body = request(server, "/leaderboards/monthly", {"Accept-Encoding": "identity"})
+    assert status == 200 and json.loads(body) == OUTPUT["leaderboards"]["monthly"]
+    status, gzip_tag, body = request(server, "/leaderboards/monthly", {"Accept-Encoding": "gzip"})
+    assert status == 200 and json.loads(gzip.decompress(body)) == OUTPUT["leaderboards"]["monthly"]
+
+    assert gzip_tag == identity_tag[:-1] + '-gz"'
+    assert server.payloads["/leaderboards/monthly"].tag("br") == identity_tag[:-1] + '-br"'
+
+
+@pytest.mark.parametrize("cached", [None, "gzip", "br"])
+def test_any_encoding_etag_revalidates(server, cached):
+    tag = server.payloads["/leaderboards/monthly"].tag(cached)
+
+    status, current_tag, body = request(server, "/leaderboards/monthly", {"Accept-Encoding": "gzip", "If-None-Match": f'"other", W/{tag}'})
+
+    assert (status, current_tag, body) == (304, server.payloads["/leaderboards/monthly"].tag("gzip"), b"")
+
+
+def test_changed_body_is_sent_again(server):
+    _, tag, _ = request(server, "/leaderboards/monthly", {"Accept-Encoding": "gzip"})
+    server.publish(dict(OUTPUT, leaderboards={"monthly": {}}))
+
+    status, new_tag, body = request(server, "/leaderboards/monthly", {"Accept-Encoding": "gzip", "If-None-Match": tag})
+
+    assert status == 200 and new_tag != tag and json.loads(gzip.decompress(body)) == {}
@@ -0,0 +1,100 @@
+import json
+import random
+from datetime import datetime
+
+import pytest
+
+from analyze_commits import CommitAnalyzer, CommitRecord, ManualContributionIndex
+
+
+def written_hashes(data: bytes) -> set:
+    leaderboards = json.loads(data)["leaderboards"]["monthly"]
+    return {commit["hash"] for entries in leaderboards.values() for entry in entries for commit in entry["commits"]}
+
+
+def test_watch_refreshes_only_when_head_moves(git_repo, tmp_path):
+    first = git_repo.commit({"a.txt": b"a\n"}, "feat: first")
+    output = tmp_path / "out.json"
+    analyzer = CommitAnalyzer(
+        str(git_repo.path), manual_contributions_path=str(tmp_path / "none.json"), write_metrics=False
+    )
+
+    # Record the output before every poll, and commit between polls 1 and 2
+    states = []
+    commits = [first]
+    snapshot = analyzer._watch_snapshot
+
+    def watch_snapshot(days):
+        if output.exists():
+            states.append((output.stat().st_mtime_ns, output.read_bytes()))
+            if len(states) == 2:
+                commits.append(git_repo.commit({"b.txt": b"b\n" * 40}, "fix: second", author="Bob", email="bob@example.com"))
+        return snapshot(days)
+
+    analyzer._watch_snapshot = watch_snapshot
+    analyzer.watch(str(output), interval=0, max_polls=3)
+    states.append((output.stat().st_mtime_ns, output.read_bytes()))
+
+    initial, after_same_head, after_commit, final = states
+    assert written_hashes(initial[1]) == {first[:8]}
+    # An unchanged HEAD leaves the file untouched
+    assert after_same_head == initial
+    # The commit made mid-run is picked up by the next poll
+    assert json.loads(after_commit[1])["total_commits_analyzed"] == 2
+    assert written_hashes(after_commit[1]) == {commit[:8] for commit in commits}
+    assert final == after_commit
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_update_leaderboards_matches_full_rebuild(tmp_path, vectorized):
+    rng = random.Random(7)
+    analyzer = CommitAnalyzer(
+        str(tmp_path), manual_contributions_path=str(tmp_path / "none.json"), vectorized=vectorized, write_metrics=False
+    )
+    start = datetime(2025, 1, 1).timestamp()
+    serial = iter(range(10 ** 6))
+
+    def rescore(commit):
+        commit.loc_score, commit.files_score, commit.keyword_score = rng.choice([3, 8, 30]), 5, 12
+        commit.ai_score = rng.randint(0, 25)
+        commit.classification = "significant" if commit.total_score >= 50 else "simple"
+
+    def new_commit():
+        author = rng.choice(["Alice", "Bob", "Carol", "Dave", "Erin"])
+        commit = CommitRecord(f"{next(serial):040x}", author, f"{author.lower()}@example.com",
+                              int(start + rng.uniform(0, 200 * 86400)), "feat: change")
+        rescore(commit)
+        return commit
+
+    # History order is not date order, so new commits also land in old periods
+    history = [new_commit() for _ in range(300)]
+    state = analyzer._build_leaderboards(history)
+    for round_number in range(6):
+        dropped = set(rng.sample(range(len(history)), 5)) | set(range(len(history) - 10, len(history)))
+        removed = [commit for i, commit in enumerate(history) if i in dropped]
+        history = [commit for i, commit in enumerate(history) if i not in dropped]
+        rescored = []
+        for commit in rng.sample(history, 5):
+            rescored.append((commit, commit.classification == "significant", commit.total_score))
+            rescore(commit)
+        added = [new_commit() for _ in range(12)]
+        for commit in added:
+            history.insert(rng.choice([0, 0, rng.randrange(len(history))]), commit)
+        analyzer.manual_contributions = {rng.choice(["Alice", "Bob", "Zoe"]): {"contributions": [
+            {"score": 10 * round_number, "notes": "talks", "start_date": "2025-02-01", "end_date": "2025-03-15"}
+        ]}}
+        analyzer.manual_index = ManualContributionIndex(analyzer.manual_contributions)
+
+        positions = {commit.hash: position for position, commit in enumerate(history)}
+        assert analyzer.update_leaderboards(state, positions, added, removed, rescored)
+
+        expected = analyzer._build_leaderboards(history)
+        # Same entries in the same order, and the same totals to build on next time
+        assert {period_type: list(periods) for period_type, periods in state.leaderboards.items()} == {
+            period_type: list(periods) for period_type, periods in expected.leaderboards.items()
+        }
+        assert state.leaderboards == expected.leaderboards
+        assert state.totals == expected.totals
+
+    # Nothing changed: nothing to rewrite
+    assert not analyzer.update_leaderboards(state, positions, [], [], [])